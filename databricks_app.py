@@ -4,133 +4,472 @@ Combines React frontend with FastAPI backend following Databricks Apps best prac
 Based on: https://www.databricks.com/blog/building-databricks-apps-react-and-mosaic-ai-agents-enterprise-chat-solutions
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+from bisect import bisect_right, insort
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import json
-import io
+import re
+import hashlib
+import functools
+import mimetypes
+import orjson
+import tempfile
+import gzip
+import queue
+import fcntl
 import uuid
-from pydantic import BaseModel
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+import asyncio
+import threading
+import logging
+import multiprocessing
+import traceback
+from pydantic import BaseModel, ConfigDict
+import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
+
+# LOG_LEVEL=DEBUG turns on per-column mapping diagnostics; production runs at INFO
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
 
 # ============================================================================
 # API Application (Backend Logic)
 # ============================================================================
 
-api_app = FastAPI(title="Data Profiler API", version="1.0.0")
+class OrjsonResponse(JSONResponse):
+    """Compact JSON response rendered by orjson (FastAPI's own ORJSONResponse is deprecated)"""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+api_app = FastAPI(title="Data Profiler API", version="1.0.0", default_response_class=OrjsonResponse)
 
 # CORS middleware for API
+# The bundled UI is served same-origin; only separately hosted frontends (e.g. a dev server) need listing
+CORS_ALLOW_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ALLOW_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
+    if origin.strip()
+]
+
 api_app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ALLOW_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
 
+# SSE must flush frame by frame, and .xlsx files are already zip-compressed
+_GZIP_EXCLUDED_PATHS = ("/databricks/execute-stream", "/export/excel")
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip API responses, passing streaming and binary endpoints through untouched"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith(_GZIP_EXCLUDED_PATHS):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+api_app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024)
+
 
 # ============================================================================
 # Databricks Connection Management
 # ============================================================================
 
-def get_oauth_token():
-    """Get OAuth token using client credentials (Databricks Apps)"""
-    workspace_host = os.getenv("DATABRICKS_SERVER_HOSTNAME", "")
-    client_id = os.getenv("DATABRICKS_CLIENT_ID", "")
-    client_secret = os.getenv("DATABRICKS_CLIENT_SECRET", "")
-    
-    url = f"https://{workspace_host}/oidc/v1/token"
+# Connection settings are fixed for the lifetime of the process - resolve them once
+_WORKSPACE_HOST = os.getenv("DATABRICKS_SERVER_HOSTNAME", "")
+_HTTP_PATH = os.getenv("DATABRICKS_HTTP_PATH", "")
+_WAREHOUSE_ID = _HTTP_PATH.rsplit("/warehouses/", 1)[-1] if "/warehouses/" in _HTTP_PATH else ""
+_CLIENT_ID = os.getenv("DATABRICKS_CLIENT_ID", "")
+_CLIENT_SECRET = os.getenv("DATABRICKS_CLIENT_SECRET", "")
+_OIDC_TOKEN_URL = f"https://{_WORKSPACE_HOST}/oidc/v1/token"
+_SUBMIT_URL = f"https://{_WORKSPACE_HOST}/api/2.0/sql/statements"
+
+# Shared HTTP session: keeps TLS connections to the workspace alive across calls.
+# pool_block makes concurrent statements wait for a warm pooled connection instead
+# of opening overflow connections that pay a full TLS handshake and are then discarded
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    pool_block=True,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+))
+_SESSION.headers.update({"User-Agent": "data-profiler/1.0"})
+
+# Upper bound on statements this worker keeps running on the warehouse at once;
+# callers beyond it wait for a free slot instead of opening more work
+DATABRICKS_MAX_STATEMENTS = int(os.getenv("DATABRICKS_MAX_STATEMENTS", "16"))
+_STATEMENT_SLOTS = threading.BoundedSemaphore(DATABRICKS_MAX_STATEMENTS)
+# Blocking Databricks calls run on their own threads, sized to the statement slots, so long
+# statements and long-polls never exhaust asyncio's small default executor (left for short local work)
+_DATABRICKS_IO_POOL = ThreadPoolExecutor(max_workers=DATABRICKS_MAX_STATEMENTS, thread_name_prefix="databricks-io")
+
+
+async def run_databricks_io(func, *args, **kwargs):
+    """Run a blocking Databricks call on the dedicated Databricks I/O threads"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _DATABRICKS_IO_POOL, functools.partial(func, *args, **kwargs)
+    )
+
+# OAuth tokens keyed by (client_id, client_secret) -> (access_token, monotonic expiry)
+_TOKEN_CACHE: Dict[tuple, tuple] = {}
+_TOKEN_LOCK = threading.Lock()
+# In-progress refreshes, so concurrent callers share a single OIDC request
+_TOKEN_INFLIGHT: Dict[tuple, Future] = {}
+# Refresh this many seconds before the token actually expires
+_TOKEN_EXPIRY_MARGIN_S = 60
+
+
+def _fetch_oauth_token() -> tuple:
+    """Request a new token from the OIDC endpoint, returning (token, expiry)"""
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
     data = {
         'grant_type': 'client_credentials',
-        'client_id': client_id,
-        'client_secret': client_secret,
+        'client_id': _CLIENT_ID,
+        'client_secret': _CLIENT_SECRET,
         'scope': 'all-apis'
     }
     
-    response = requests.post(url, headers=headers, data=data)
+    response = _SESSION.post(_OIDC_TOKEN_URL, headers=headers, data=data)
     response.raise_for_status()
-    return response.json().get('access_token')
+    token_data = response.json()
+    expires_in = float(token_data.get('expires_in') or 3600)
+    return token_data.get('access_token'), time.monotonic() + expires_in
 
 
-def execute_sql(sql: str):
-    """Execute SQL using Statements API (same as governance app)"""
-    token = get_oauth_token()
-    workspace_host = os.getenv("DATABRICKS_SERVER_HOSTNAME", "")
-    http_path = os.getenv("DATABRICKS_HTTP_PATH", "")
-    warehouse_id = http_path.split('/warehouses/')[-1] if '/warehouses/' in http_path else ""
+def get_oauth_token():
+    """Get OAuth token using client credentials (Databricks Apps), cached until shortly before expiry"""
+    cache_key = (_CLIENT_ID, _CLIENT_SECRET)
+    
+    with _TOKEN_LOCK:
+        cached = _TOKEN_CACHE.get(cache_key)
+        if cached and time.monotonic() < cached[1] - _TOKEN_EXPIRY_MARGIN_S:
+            return cached[0]
+        inflight = _TOKEN_INFLIGHT.get(cache_key)
+        if inflight is None:
+            # This caller does the refresh; everyone arriving meanwhile waits on its future
+            inflight = _TOKEN_INFLIGHT[cache_key] = Future()
+            leader = True
+        else:
+            leader = False
+    
+    if not leader:
+        return inflight.result()
+    
+    try:
+        token, expiry = _fetch_oauth_token()
+    except BaseException as e:
+        with _TOKEN_LOCK:
+            _TOKEN_INFLIGHT.pop(cache_key, None)
+        inflight.set_exception(e)
+        raise
+    
+    with _TOKEN_LOCK:
+        _TOKEN_CACHE[cache_key] = (token, expiry)
+        _TOKEN_INFLIGHT.pop(cache_key, None)
+    inflight.set_result(token)
+    return token
+
+
+def invalidate_oauth_token():
+    """Drop the cached OAuth token so the next call fetches a fresh one"""
+    with _TOKEN_LOCK:
+        _TOKEN_CACHE.pop((_CLIENT_ID, _CLIENT_SECRET), None)
+
+
+def _authorized_request(method: str, url: str, **kwargs):
+    """Send a request with the cached bearer token, refreshing it once on 401"""
+    headers = {'Authorization': f'Bearer {get_oauth_token()}', 'Content-Type': 'application/json'}
+    response = _SESSION.request(method, url, headers=headers, **kwargs)
+    if response.status_code == 401:
+        # Token was revoked or rotated server-side - drop it and retry once
+        invalidate_oauth_token()
+        headers['Authorization'] = f'Bearer {get_oauth_token()}'
+        response = _SESSION.request(method, url, headers=headers, **kwargs)
+    return response
+
+
+_TERMINAL_STATES = ("SUCCEEDED", "FAILED", "CANCELED", "CLOSED")
+# Wall-clock budget for a statement, matching the gunicorn worker timeout in app.yaml
+SQL_MAX_WAIT_S = float(os.getenv("SQL_MAX_WAIT_S", "300"))
+
+# INLINE returns rows in the API response body. EXTERNAL_LINKS returns pre-signed
+# cloud storage URLs per result chunk, keeping large results off the API tier
+RESULT_DISPOSITION = os.getenv("DATABRICKS_RESULT_DISPOSITION", "INLINE").upper()
+_RESULT_CHUNK_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="result-chunk")
+
+
+def _fetch_external_result(statement: dict) -> list:
+    """Download every EXTERNAL_LINKS result chunk concurrently and concatenate the rows"""
+    statement_id = statement.get("statement_id")
+    chunk_count = (statement.get("manifest") or {}).get("total_chunk_count") or 0
+    inline_links = (statement.get("result") or {}).get("external_links") or []
     
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
-    submit_url = f"https://{workspace_host}/api/2.0/sql/statements"
+    def fetch_chunk(chunk_index: int) -> list:
+        links = [link for link in inline_links if link.get("chunk_index") == chunk_index]
+        if not links:
+            r = _authorized_request("GET", f"{_SUBMIT_URL}/{statement_id}/result/chunks/{chunk_index}")
+            r.raise_for_status()
+            links = orjson.loads(r.content).get("external_links") or []
+        rows = []
+        for link in links:
+            # Pre-signed URL - must not carry the workspace bearer token
+            resp = _SESSION.get(link["external_link"], headers=link.get("http_headers"))
+            resp.raise_for_status()
+            rows.extend(orjson.loads(resp.content))
+        return rows
     
+    return [row for chunk in _RESULT_CHUNK_POOL.map(fetch_chunk, range(chunk_count)) for row in chunk]
+
+
+def submit_statement(sql: str, wait_timeout: str = "50s", disposition: Optional[str] = None,
+                     parameters: Optional[Dict[str, Any]] = None) -> dict:
+    """
+    Submit a statement; the response may still be PENDING/RUNNING once wait_timeout elapses
+    parameters binds :name markers in the SQL (values are sent as strings, never spliced into the text)
+    """
     payload = {
         "statement": sql,
-        "warehouse_id": warehouse_id,
-        "wait_timeout": "30s"
+        "warehouse_id": _WAREHOUSE_ID,
+        "disposition": disposition or RESULT_DISPOSITION,
+        "format": "JSON_ARRAY",
+        "wait_timeout": wait_timeout,
+        "on_wait_timeout": "CONTINUE"
     }
-    
-    r = requests.post(submit_url, headers=headers, json=payload)
+    if parameters:
+        payload["parameters"] = [
+            {"name": name, "value": None if value is None else str(value)}
+            for name, value in parameters.items()
+        ]
+    r = _authorized_request("POST", _SUBMIT_URL, data=orjson.dumps(payload))
     r.raise_for_status()
-    stmt = r.json()
-    statement_id = stmt.get("statement_id")
-    status = (stmt.get("status") or {}).get("state")
+    return orjson.loads(r.content)
+
+
+def get_statement(statement_id: str) -> dict:
+    """Fetch a statement's current status (and first result chunk once SUCCEEDED)"""
+    rr = _authorized_request("GET", f"{_SUBMIT_URL}/{statement_id}")
+    rr.raise_for_status()
+    return orjson.loads(rr.content)
+
+
+def cancel_statement(statement_id: str):
+    """Ask the warehouse to stop a running statement (best effort)"""
+    _authorized_request("POST", f"{_SUBMIT_URL}/{statement_id}/cancel")
+
+
+def statement_state(statement: dict) -> Optional[str]:
+    """Return the state of a Statements API response"""
+    return (statement.get("status") or {}).get("state")
+
+
+def wait_for_statement(statement: dict, deadline: float) -> dict:
+    """Poll a submitted statement until it reaches a terminal state or the monotonic deadline passes"""
+    status_url = f"{_SUBMIT_URL}/{statement.get('statement_id')}"
+    attempt = 0
+    delay = 0.05
+    while statement_state(statement) not in _TERMINAL_STATES and time.monotonic() < deadline:
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        attempt += 1
+        rr = _authorized_request("GET", status_url)
+        rr.raise_for_status()
+        statement = orjson.loads(rr.content)
+        # Honor a server-suggested interval, otherwise back off from 50ms up to 1s
+        retry_after = rr.headers.get("Retry-After", "")
+        delay = float(retry_after) if retry_after.isdigit() else min(1.0, 0.05 * (2 ** attempt))
+    return statement
+
+
+def statement_rows(statement: dict, return_format: str = "dicts"):
+    """
+    Extract the rows of a SUCCEEDED statement
+    return_format="dicts" returns a list of row dicts keyed by column name;
+    return_format="arrays" returns {"columns": [...], "rows": [[...], ...]} untouched
+    """
+    # Column names live in the statement-level manifest
+    result = statement.get("result") or {}
+    manifest = statement.get("manifest") or {}
+    columns_meta = (manifest.get("schema") or {}).get("columns") or []
+    column_names = [col.get("name") for col in columns_meta]
     
-    # If already finished
-    if status in ("SUCCEEDED", "FAILED", "CANCELED"):
-        final = stmt
+    # Get rows as list of arrays
+    if "external_links" in result:
+        data_array = _fetch_external_result(statement)
     else:
-        # Poll for completion
-        status_url = f"{submit_url}/{statement_id}"
-        for _ in range(60):  # up to 60s
-            rr = requests.get(status_url, headers=headers)
-            rr.raise_for_status()
-            final = rr.json()
-            state = (final.get("status") or {}).get("state")
-            if state in ("SUCCEEDED", "FAILED", "CANCELED"):
-                break
-            time.sleep(1.0)
-    
-    state = (final.get("status") or {}).get("state")
-    if state != "SUCCEEDED":
-        error_msg = (final.get("status") or {}).get("error", {})
-        raise RuntimeError(f"SQL failed: state={state}, error={error_msg}")
-    
-    # Get column names from manifest
-    result = final.get("result") or {}
-    manifest = result.get("manifest") or {}
-    schema = manifest.get("schema") or {}
-    columns_meta = schema.get("columns") or []
+        data_array = result.get("data_array") or []
     
-    # Get rows as list of arrays
-    data_array = result.get("data_array") or []
+    # Positional callers get the rows as-is - no per-cell work
+    if return_format == "arrays":
+        return {"columns": column_names, "rows": data_array}
     
-    # If no column metadata, return raw arrays
-    # This is expected for complex queries (CTEs, aggregations, JSON functions)
-    # The calling code will manually map array positions to dict keys
+    # Without column metadata there is nothing to key the rows by - return raw arrays
     if not columns_meta:
         return data_array
     
-    # Extract column names
-    column_names = [col.get("name") for col in columns_meta]
+    # The API guarantees every row is as wide as the schema, so zip needs no padding
+    assert not data_array or len(data_array[0]) == len(column_names)
+    return [dict(zip(column_names, row)) for row in data_array]
+
+
+def warm_up_connection():
+    """Fetch the OAuth token and open a pooled HTTPS connection to the workspace ahead of the first request"""
+    if not _WORKSPACE_HOST:
+        return
+    response = _authorized_request("GET", f"https://{_WORKSPACE_HOST}/api/2.0/sql/warehouses/{_WAREHOUSE_ID}")
+    response.raise_for_status()
+
+
+class StatementSlotsBusy(RuntimeError):
+    """Raised when no statement slot frees up within a statement's time budget"""
+
+
+class StatementFailed(RuntimeError):
+    """Raised when a statement ends in a terminal state other than SUCCEEDED"""
     
-    # Convert to list of dicts for easier access
-    rows_as_dicts = []
+    def __init__(self, state: str, error: Any):
+        super().__init__(f"SQL failed: state={state}, error={error}")
+        self.state = state
+
+
+def submit_wait_timeout(budget_s: float) -> str:
+    """The submit call's wait_timeout for a time budget: the API accepts 0s (return at once) or 5-50s"""
+    if budget_s < 5:
+        return "0s"
+    return f"{min(int(budget_s), 50)}s"
+
+
+def execute_sql(sql: str, disposition: Optional[str] = None, max_wait_s: Optional[float] = None,
+                return_format: str = "dicts", parameters: Optional[Dict[str, Any]] = None):
+    """
+    Execute SQL using Statements API (same as governance app) - see statement_rows for return_format
+    max_wait_s bounds both the wait for a statement slot and, once one is held, the statement itself
+    """
+    budget_s = max_wait_s or SQL_MAX_WAIT_S
+    if not _STATEMENT_SLOTS.acquire(timeout=budget_s):
+        raise StatementSlotsBusy(f"No statement slot free within {budget_s:g}s")
     try:
-        for row in data_array:
-            row_dict = {}
-            for i, col_name in enumerate(column_names):
-                row_dict[col_name] = row[i] if i < len(row) else None
-            rows_as_dicts.append(row_dict)
-        return rows_as_dicts
-    except Exception as e:
-        print(f"Error converting rows to dicts: {e}, returning raw arrays")
-        return data_array
+        deadline = time.monotonic() + budget_s
+        # Most statements finish inside the submit call (50s at most)
+        final = wait_for_statement(
+            submit_statement(sql, submit_wait_timeout(budget_s), disposition, parameters), deadline
+        )
+    finally:
+        _STATEMENT_SLOTS.release()
+    state = statement_state(final)
+    
+    if state not in _TERMINAL_STATES:
+        # Out of time - stop the statement so it doesn't keep the warehouse busy
+        cancel_statement(final.get("statement_id"))
+        raise RuntimeError(f"SQL timed out: state={state}, statement_id={final.get('statement_id')}")
+    
+    if state != "SUCCEEDED":
+        raise StatementFailed(state, (final.get("status") or {}).get("error", {}))
+    
+    return statement_rows(final, return_format)
+
+
+# ============================================================================
+# Metadata Query Cache
+# ============================================================================
+
+# Catalog/schema/table/column listings change rarely, so identical metadata
+# queries are served from memory: key -> (monotonic expiry, rows), LRU ordered.
+# Keys are logical tuples such as ("schemas", catalog) rather than SQL text
+_METADATA_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_METADATA_CACHE_LOCK = threading.Lock()
+_METADATA_CACHE_MAXSIZE = 512
+META_CACHE_TTL = float(os.getenv("META_CACHE_TTL", "300"))
+
+
+# Replaced by /cache/invalidate in whichever worker gets the request; every worker compares its
+# (inode, mtime) with the last one it saw before serving from cache, so invalidation reaches them all
+_METADATA_INVALIDATION_MARKER = "/tmp/databricks_profiler_metadata.invalidated"
+_METADATA_SEEN_INVALIDATION: Optional[tuple] = None
+
+
+def _sync_metadata_invalidation():
+    """Drop this worker's metadata cache if any worker invalidated it since the last check (caller holds the lock)"""
+    global _METADATA_SEEN_INVALIDATION
+    try:
+        st = os.stat(_METADATA_INVALIDATION_MARKER)
+        marker = (st.st_ino, st.st_mtime_ns)
+    except FileNotFoundError:
+        marker = None
+    if marker != _METADATA_SEEN_INVALIDATION:
+        _METADATA_CACHE.clear()
+        _METADATA_SEEN_INVALIDATION = marker
+
+
+# Metadata queries currently running, so concurrent identical requests share one statement
+# (only touched from the event loop thread)
+_METADATA_INFLIGHT: Dict[tuple, asyncio.Task] = {}
+
+
+def _store_metadata_result(key: tuple, ttl: Optional[float], task: asyncio.Task):
+    """Done-callback for an in-flight metadata query: release the key and cache successful rows"""
+    _METADATA_INFLIGHT.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    with _METADATA_CACHE_LOCK:
+        _METADATA_CACHE[key] = (time.monotonic() + (META_CACHE_TTL if ttl is None else ttl), task.result())
+        _METADATA_CACHE.move_to_end(key)
+        while len(_METADATA_CACHE) > _METADATA_CACHE_MAXSIZE:
+            _METADATA_CACHE.popitem(last=False)
+
+
+async def cached_execute_sql(key: tuple, sql: str, parameters: Optional[Dict[str, Any]] = None,
+                             ttl: Optional[float] = None, refresh: bool = False):
+    """
+    Execute an idempotent metadata query off the event loop, serving repeats from a TTL/LRU cache
+    refresh=True re-runs the query even if cached; readers keep getting the old rows until it lands
+    """
+    with _METADATA_CACHE_LOCK:
+        _sync_metadata_invalidation()
+        entry = None if refresh else _METADATA_CACHE.get(key)
+        if entry and time.monotonic() < entry[0]:
+            _METADATA_CACHE.move_to_end(key)
+            return entry[1]
+    
+    task = _METADATA_INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(run_databricks_io(execute_sql, sql, parameters=parameters))
+        _METADATA_INFLIGHT[key] = task
+        task.add_done_callback(functools.partial(_store_metadata_result, key, ttl))
+    # Shielded so one client disconnecting doesn't cancel the query for the others waiting on it
+    return await asyncio.shield(task)
+
+
+def clear_metadata_cache() -> int:
+    """
+    Drop all cached metadata query results, returning how many this worker cleared
+    The shared marker file is replaced too, so every other worker drops its cache on its next lookup
+    """
+    with _METADATA_CACHE_LOCK:
+        cleared = len(_METADATA_CACHE)
+        _METADATA_CACHE.clear()
+        _write_file_atomic(_METADATA_INVALIDATION_MARKER, uuid.uuid4().bytes)
+        _sync_metadata_invalidation()
+    return cleared
 
 
 # ============================================================================
@@ -138,35 +477,53 @@ def execute_sql(sql: str):
 # ============================================================================
 
 class ProfilingQuery(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
     fieldKey: str
     query: str
     description: str
 
 
 class QueryRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
     queries: List[ProfilingQuery]
 
 
+# Response models are built server-side from trusted data - construct them with
+# model_construct() and keep row payloads as plain lists to skip per-key validation.
+# Routes declare them through responses= (OpenAPI only) and send them with model_response(),
+# since a return annotation or response_model would make FastAPI validate them again
 class CatalogTreeResponse(BaseModel):
-    catalogs: List[Dict[str, Any]]
+    catalogs: list
 
 
 class QueryExecutionResponse(BaseModel):
-    results: List[Dict[str, Any]]
+    results: list
     success: bool
     message: Optional[str] = None
 
 
+def model_response(model: BaseModel) -> OrjsonResponse:
+    """Serialize a model_construct()-ed response model's fields directly, skipping validation"""
+    return OrjsonResponse(dict(model))
+
+
 # ============================================================================
 # API Endpoints
 # ============================================================================
 
+# Seconds a health probe waits for its SELECT 1 before reporting unhealthy
+_HEALTH_CHECK_WAIT_S = 5
+
+
 @api_app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
     try:
-        # Test SQL execution
-        execute_sql("SELECT 1")
+        # Test SQL execution off the event loop, failing fast rather than waiting out SQL_MAX_WAIT_S;
+        # kept on the default executor so probes never queue behind long statements on the Databricks pool
+        await asyncio.to_thread(execute_sql, "SELECT 1", max_wait_s=_HEALTH_CHECK_WAIT_S)
         
         return {
             "status": "healthy",
@@ -174,6 +531,8 @@ async def health_check():
             "app": "data-profiler",
             "version": "1.0.0"
         }
+    except StatementSlotsBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         return {
             "status": "unhealthy",
@@ -181,117 +540,202 @@ async def health_check():
         }
 
 
+# The catalog list is refreshed in the background on this interval while it is being read (see refresh_catalogs_loop)
+CATALOG_REFRESH_S = float(os.getenv("CATALOG_REFRESH_S", "300"))
+# Monotonic time the catalog list was last served to a request
+_CATALOGS_LAST_READ = float("-inf")
+
+
+def metadata_response(request: Request, payload: dict) -> Response:
+    """Serialize a metadata listing with an ETag, answering 304 when the client already has it"""
+    body = orjson.dumps(payload)
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "max-age=60"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Compression middleware may weaken the tag, so compare ignoring the W/ prefix
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def fetch_catalogs(refresh: bool = False) -> List[dict]:
+    """List catalogs as [{"name": ...}] (cached; kept warm by refresh_catalogs_loop)"""
+    global _CATALOGS_LAST_READ
+    if not refresh:
+        _CATALOGS_LAST_READ = time.monotonic()
+    # TTL outlives the refresh interval so requests never wait on Databricks while the loop runs
+    catalogs_data = await cached_execute_sql(("catalogs",), """
+        SELECT catalog_name 
+        FROM system.information_schema.catalogs 
+        WHERE catalog_owner IS NOT NULL 
+        ORDER BY catalog_name
+    """, ttl=max(META_CACHE_TTL, CATALOG_REFRESH_S * 2), refresh=refresh)
+    # Handle both dict (with column names) and array (fallback) formats
+    if catalogs_data and isinstance(catalogs_data[0], dict):
+        return [{"name": row["catalog_name"]} for row in catalogs_data]
+    return [{"name": row[0]} for row in catalogs_data]
+
+
+async def fetch_schemas(catalog: str) -> List[dict]:
+    """List schemas in a catalog as [{"name": ...}] (cached)"""
+    schemas_data = await cached_execute_sql(("schemas", catalog), """
+        SELECT schema_name
+        FROM system.information_schema.schemata
+        WHERE catalog_name = :catalog
+            AND schema_name NOT IN ('information_schema', 'system')
+        ORDER BY schema_name
+    """, {"catalog": catalog})
+    # Handle both dict and array formats
+    if schemas_data and isinstance(schemas_data[0], dict):
+        return [{"name": row["schema_name"]} for row in schemas_data]
+    return [{"name": row[0]} for row in schemas_data]
+
+
+async def fetch_tables(catalog: str, schema: str) -> List[dict]:
+    """List tables in catalog.schema as [{"name": ...}] (cached)"""
+    tables_data = await cached_execute_sql(("tables", catalog, schema), """
+        SELECT table_name
+        FROM system.information_schema.tables
+        WHERE table_catalog = :catalog
+            AND table_schema = :schema
+        ORDER BY table_name
+    """, {"catalog": catalog, "schema": schema})
+    # Handle both dict and array formats
+    if tables_data and isinstance(tables_data[0], dict):
+        return [{"name": row["table_name"]} for row in tables_data]
+    return [{"name": row[0]} for row in tables_data]
+
+
+async def fetch_schemas_with_tables(catalog: str) -> List[dict]:
+    """List schemas in a catalog with their tables as [{"name": ..., "tables": [{"name": ...}]}] (cached)"""
+    rows = await cached_execute_sql(("schemas-with-tables", catalog), """
+        SELECT s.schema_name, t.table_name
+        FROM system.information_schema.schemata s
+        LEFT JOIN system.information_schema.tables t
+            ON t.table_catalog = s.catalog_name
+            AND t.table_schema = s.schema_name
+        WHERE s.catalog_name = :catalog
+            AND s.schema_name NOT IN ('information_schema', 'system')
+        ORDER BY s.schema_name, t.table_name
+    """, {"catalog": catalog})
+    # Handle both dict and array formats
+    if rows and isinstance(rows[0], dict):
+        rows = [(row["schema_name"], row["table_name"]) for row in rows]
+    
+    # Rows arrive ordered by schema; schemas without tables come back with a NULL table_name
+    return [
+        {"name": schema_name, "tables": [{"name": table_name} for _, table_name in group if table_name is not None]}
+        for schema_name, group in groupby(rows, key=itemgetter(0))
+    ]
+
+
+async def fetch_columns(catalog: str, schema: str, table: str) -> List[dict]:
+    """List columns of a table as [{"name": ..., "type": ...}] (cached)"""
+    columns_data = await cached_execute_sql(("columns", catalog, schema, table), """
+        SELECT column_name, data_type
+        FROM system.information_schema.columns
+        WHERE table_catalog = :catalog
+            AND table_schema = :schema
+            AND table_name = :table
+        ORDER BY ordinal_position
+    """, {"catalog": catalog, "schema": schema, "table": table})
+    # Handle both dict and array formats
+    if columns_data and isinstance(columns_data[0], dict):
+        return [{"name": row["column_name"], "type": row["data_type"]} for row in columns_data]
+    return [{"name": row[0], "type": row[1]} for row in columns_data]
+
+
 @api_app.get("/catalogs")
-async def get_catalogs():
+async def get_catalogs(request: Request):
     """Get list of catalogs only - fast, incremental loading"""
     try:
-        catalogs_data = execute_sql("""
-            SELECT catalog_name 
-            FROM system.information_schema.catalogs 
-            WHERE catalog_owner IS NOT NULL 
-            ORDER BY catalog_name
-        """)
-        # Handle both dict (with column names) and array (fallback) formats
-        if catalogs_data and isinstance(catalogs_data[0], dict):
-            catalogs = [{"name": row["catalog_name"]} for row in catalogs_data]
-        else:
-            catalogs = [{"name": row[0]} for row in catalogs_data]
-        return {"catalogs": catalogs}
+        return metadata_response(request, {"catalogs": await fetch_catalogs()})
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         print(f"Error fetching catalogs: {error_details}")
         raise HTTPException(status_code=500, detail=f"Error fetching catalogs: {str(e)}")
 
 
 @api_app.get("/schemas")
-async def get_schemas(catalog: str):
+async def get_schemas(request: Request, catalog: str):
     """Get schemas for a specific catalog"""
     try:
-        schemas_data = execute_sql(f"""
-            SELECT schema_name
-            FROM system.information_schema.schemata
-            WHERE catalog_name = '{catalog}'
-                AND schema_name NOT IN ('information_schema', 'system')
-            ORDER BY schema_name
-        """)
-        # Handle both dict and array formats
-        if schemas_data and isinstance(schemas_data[0], dict):
-            schemas = [{"name": row["schema_name"]} for row in schemas_data]
-        else:
-            schemas = [{"name": row[0]} for row in schemas_data]
-        return {"schemas": schemas}
+        return metadata_response(request, {"schemas": await fetch_schemas(catalog)})
     except Exception as e:
-        import traceback
         print(f"Error fetching schemas: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error fetching schemas: {str(e)}")
 
 
 @api_app.get("/tables")
-async def get_tables(catalog: str, schema: str):
+async def get_tables(request: Request, catalog: str, schema: str):
     """Get tables for a specific catalog.schema"""
     try:
-        tables_data = execute_sql(f"""
-            SELECT table_name
-            FROM system.information_schema.tables
-            WHERE table_catalog = '{catalog}'
-                AND table_schema = '{schema}'
-            ORDER BY table_name
-        """)
-        # Handle both dict and array formats
-        if tables_data and isinstance(tables_data[0], dict):
-            tables = [{"name": row["table_name"]} for row in tables_data]
-        else:
-            tables = [{"name": row[0]} for row in tables_data]
-        return {"tables": tables}
+        return metadata_response(request, {"tables": await fetch_tables(catalog, schema)})
     except Exception as e:
-        import traceback
         print(f"Error fetching tables: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error fetching tables: {str(e)}")
 
 
+@api_app.get("/schemas-with-tables")
+async def get_schemas_with_tables(request: Request, catalog: str):
+    """Get every schema in a catalog together with its tables in a single query"""
+    try:
+        return metadata_response(request, {"schemas": await fetch_schemas_with_tables(catalog)})
+    except Exception as e:
+        logger.exception("Error fetching schemas with tables")
+        raise HTTPException(status_code=500, detail=f"Error fetching schemas with tables: {str(e)}")
+
+
 @api_app.get("/columns")
-async def get_columns(catalog: str, schema: str, table: str):
+async def get_columns(request: Request, catalog: str, schema: str, table: str):
     """Get columns for a specific table"""
     try:
-        columns_data = execute_sql(f"""
-            SELECT column_name, data_type
-            FROM system.information_schema.columns
-            WHERE table_catalog = '{catalog}'
-                AND table_schema = '{schema}'
-                AND table_name = '{table}'
-            ORDER BY ordinal_position
-        """)
-        # Handle both dict and array formats
-        if columns_data and isinstance(columns_data[0], dict):
-            columns = [{"name": row["column_name"], "type": row["data_type"]} for row in columns_data]
-        else:
-            columns = [{"name": row[0], "type": row[1]} for row in columns_data]
-        return {"columns": columns}
+        return metadata_response(request, {"columns": await fetch_columns(catalog, schema, table)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching columns: {str(e)}")
 
 
-@api_app.get("/catalog-tree")
-async def get_catalog_tree() -> CatalogTreeResponse:
+@api_app.get("/browse")
+async def browse(request: Request, catalog: Optional[str] = None, schema: Optional[str] = None,
+                 table: Optional[str] = None):
+    """
+    Get every level of the catalog browser down to the given path in one request
+    Returns catalogs, plus schemas / tables / columns as catalog, schema and table are given;
+    the lookups run concurrently
+    """
+    if (schema and not catalog) or (table and not schema):
+        raise HTTPException(status_code=400, detail="schema requires catalog, and table requires schema")
+    
+    lookups = {"catalogs": fetch_catalogs()}
+    if catalog:
+        lookups["schemas"] = fetch_schemas(catalog)
+    if schema:
+        lookups["tables"] = fetch_tables(catalog, schema)
+    if table:
+        lookups["columns"] = fetch_columns(catalog, schema, table)
+    
+    try:
+        results = await asyncio.gather(*lookups.values())
+        return metadata_response(request, dict(zip(lookups.keys(), results)))
+    except Exception as e:
+        logger.exception("Error browsing metadata")
+        raise HTTPException(status_code=500, detail=f"Error browsing metadata: {str(e)}")
+
+
+@api_app.get("/catalog-tree", response_model=None, responses={200: {"model": CatalogTreeResponse}})
+async def get_catalog_tree():
     """
     DEPRECATED - Use incremental endpoints instead (/catalogs, /schemas, /tables, /columns)
     This loads everything at once and is too slow
     """
     try:
         # Just return catalogs - frontend should use incremental endpoints
-        catalogs_data = execute_sql("""
-            SELECT catalog_name 
-            FROM system.information_schema.catalogs 
-            WHERE catalog_owner IS NOT NULL 
-            ORDER BY catalog_name
-        """)
-        # Handle both dict and array formats
-        if catalogs_data and isinstance(catalogs_data[0], dict):
-            catalogs = [{"name": row["catalog_name"], "schemas": []} for row in catalogs_data]
-        else:
-            catalogs = [{"name": row[0], "schemas": []} for row in catalogs_data]
-        return CatalogTreeResponse(catalogs=catalogs)
+        catalogs = [{"name": catalog["name"], "schemas": []} for catalog in await fetch_catalogs()]
+        return model_response(CatalogTreeResponse.model_construct(catalogs=catalogs))
     
     except Exception as e:
         raise HTTPException(
@@ -300,307 +744,467 @@ async def get_catalog_tree() -> CatalogTreeResponse:
         )
 
 
+@api_app.post("/cache/invalidate")
+async def invalidate_metadata_cache():
+    """
+    Clear cached metadata listings (e.g. after creating or dropping schemas/tables)
+    cleared counts this worker's entries; other workers drop theirs on their next metadata lookup
+    """
+    cleared = await asyncio.to_thread(clear_metadata_cache)
+    return {"success": True, "cleared": cleared, "scope": "all workers"}
+
+
 # Helper functions for type conversion
+# Exact type() checks come first: values parsed from JSON payloads are often already typed
 def to_float(val, default=0.0):
     """Safely convert value to float"""
+    t = type(val)
+    if t is float:
+        return val
+    if t is int:
+        return float(val)
+    if val is None or val == '':
+        return default
     try:
-        return float(val) if val is not None and val != '' else default
+        return float(val)
     except (ValueError, TypeError):
         return default
 
 def to_int(val, default=0):
     """Safely convert value to int"""
+    if type(val) is int:
+        return val
+    if val is None or val == '':
+        return default
     try:
-        return int(float(val)) if val is not None and val != '' else default
+        return int(float(val))
     except (ValueError, TypeError):
         return default
 
 def to_bool(val):
     """Safely convert value to bool"""
-    if isinstance(val, bool):
+    t = type(val)
+    if t is bool:
         return val
-    if isinstance(val, str):
+    if t is str or isinstance(val, str):
         return val.lower() in ('true', '1', 'yes')
     return bool(val)
 
 def to_str(val):
     """Safely convert value to string"""
+    if type(val) is str:
+        return val
     return str(val) if val is not None else ''
 
 
+# JSON-encoded profiling columns (top_values, patterns, samples, ...) are parsed with orjson
+_loads = orjson.loads
+
+# Substring matches against the documented type (bigint/smallint/tinyint are covered by "int")
+_NUMERIC_TYPE_RE = re.compile(r"int|decimal|double|float|long")
+_DATE_TYPE_RE = re.compile(r"date|timestamp")
+_STRING_TYPE_RE = re.compile(r"string|varchar")
+
+
+@functools.lru_cache(maxsize=256)
+def classify_documented_type(documented_type: str) -> tuple:
+    """Return (is_numeric, is_date, is_string) for a lower-cased documented type"""
+    return (
+        _NUMERIC_TYPE_RE.search(documented_type) is not None,
+        _DATE_TYPE_RE.search(documented_type) is not None,
+        _STRING_TYPE_RE.search(documented_type) is not None,
+    )
+
+
+def _identity(val):
+    """Pass a value through unchanged (columns kept as returned, e.g. names and dates)"""
+    return val
+
+
+def _to_float_or_none(val):
+    """Convert value to float, keeping missing stats as None"""
+    return to_float(val, None)
+
+
+def _coerce_json_items(val, int_key: str, float_key: str):
+    """Parse a JSON array of dicts and convert its count/ratio fields to numbers"""
+    try:
+        items = _loads(val) if isinstance(val, (bytes, str)) else val
+        if isinstance(items, list):
+            for item in items:
+                if isinstance(item, dict):
+                    if int_key in item:
+                        item[int_key] = to_int(item[int_key])
+                    if float_key in item:
+                        item[float_key] = to_float(item[float_key])
+        return items
+    except Exception:
+        return []
+
+
+def _parse_value_counts(val):
+    """Parse top_values / all_values"""
+    return _coerce_json_items(val, 'frequency', 'frequency_pct')
+
+
+def _parse_patterns(val):
+    """Parse patterns (NULL for non-strings)"""
+    return _coerce_json_items(val, 'pattern_count', 'avg_pattern_length') or []
+
+
+_get_rn = itemgetter('rn')
+_get_sample_rn = itemgetter('sample_rn')
+
+
+def _parse_ranked(val, value_key: str, rank_key: str, get_rank, convert) -> list:
+    """Parse a JSON array of ranked entries into a list of values ordered by rank"""
+    try:
+        items = _loads(val) if isinstance(val, (bytes, str)) else val
+        if not isinstance(items, list):
+            return []
+        ranked = [item for item in items if isinstance(item, dict) and item.get(value_key) is not None]
+        try:
+            # COLLECT_LIST doesn't guarantee ROW_NUMBER order; the sort is linear when it already holds
+            ranked.sort(key=get_rank)
+        except KeyError:
+            # Entries without a rank go last
+            ranked.sort(key=lambda x: x.get(rank_key, 999))
+        return [convert(item[value_key]) for item in ranked]
+    except Exception:
+        return []
+
+
+def _parse_extreme_values(val) -> list:
+    """Parse smallest_values / largest_values (NULL for non-numerics)"""
+    return _parse_ranked(val, 'value', 'rn', _get_rn, to_float)
+
+
+def _parse_samples(val) -> list:
+    """Parse first_samples / random_samples"""
+    return _parse_ranked(val, 'sample_value', 'sample_rn', _get_sample_rn, str)
+
+
+# Profiling result layout, in SQL column order: (field, converter[, default when the row is short])
+# Base columns (always present) - positions 0-14
+_BASE_SCHEMA = (
+    ("catalog_name", _identity, None),
+    ("schema_name", _identity, None),
+    ("table_name", _identity, None),
+    ("column_name", _identity, None),
+    ("documented_type", _identity, None),
+    ("total_rows", to_int, 0),
+    ("non_null_count", to_int, 0),
+    ("null_count", to_int, 0),
+    ("null_percentage", to_float, 0.0),
+    ("unique_count", to_int, 0),
+    ("cardinality_pct", to_float, 0.0),
+    ("unique_percentage", to_float, 0.0),
+    ("duplicate_percentage", to_float, 0.0),
+    ("is_categorical", to_bool, False),
+    ("captured_values_count", to_int, 0),
+)
+# String-specific fields
+_STRING_SCHEMA = (
+    ("avg_length", to_float),
+    ("min_length", to_float),
+    ("max_length", to_float),
+    ("median_length", to_float),
+)
+# Numeric-specific fields
+_NUMERIC_SCHEMA = (
+    ("min_value", _to_float_or_none),
+    ("max_value", _to_float_or_none),
+    ("mean_value", _to_float_or_none),
+    ("stddev_value", _to_float_or_none),
+    ("median_value", _to_float_or_none),
+    ("p25_value", _to_float_or_none),
+    ("p75_value", _to_float_or_none),
+    ("p95_value", _to_float_or_none),
+    ("p99_value", _to_float_or_none),
+    ("zeros_count", to_int),
+    ("negatives_count", to_int),
+    ("infinite_count", to_int),
+)
+# Date-specific fields (kept as strings)
+_DATE_SCHEMA = (
+    ("min_date", _identity),
+    ("max_date", _identity),
+)
+# Always-present trailing fields
+_TRAILING_SCHEMA = (
+    ("inferred_type", _identity),
+    ("type_confidence_pct", to_float),
+    ("top_values", _parse_value_counts),
+    ("all_values", _parse_value_counts),
+    ("patterns", _parse_patterns),
+    ("smallest_values", _parse_extreme_values),
+    ("largest_values", _parse_extreme_values),
+    ("first_samples", _parse_samples),
+    ("random_samples", _parse_samples),
+)
+
+
+# Converter per profiling column name, for rows that arrive labeled
+_PROFILE_CONVERTERS = {
+    name: convert
+    for schema in (_BASE_SCHEMA, _STRING_SCHEMA, _NUMERIC_SCHEMA, _DATE_SCHEMA, _TRAILING_SCHEMA)
+    for name, convert, *_ in schema
+}
+
+
+def _apply_schema(result: dict, row: list, pos: int, schema: tuple) -> int:
+    """Convert row[pos:pos+len(schema)] into result and return the next position"""
+    for offset, (name, convert) in enumerate(schema):
+        result[name] = convert(row[pos + offset])
+    return pos + len(schema)
+
+
 def map_profiling_array_to_dict(row: list, field_name: str) -> dict:
     """
     Map profiling query result array to dictionary with correct column names
+    Fallback for rows returned without column labels - see map_profiling_row
     The SQL query structure is defined in utils/sqlProfiler.ts
     Column order is: catalog, schema, table, column, type, [stats based on data type]
     """
     if not row or len(row) < 5:
         return {}
+    row_len = len(row)
     
     # Detect data type from position 4 (documented_type)
-    documented_type = str(row[4]).lower() if len(row) > 4 else ''
+    documented_type = str(row[4]).lower()
     
-    # Check data type categories
-    is_numeric = any(t in documented_type for t in ['bigint', 'int', 'smallint', 'tinyint', 'decimal', 'double', 'float', 'long'])
-    is_date = any(t in documented_type for t in ['date', 'timestamp'])
-    is_string = 'string' in documented_type or 'varchar' in documented_type
+    # Check data type categories (a type can fall in more than one, e.g. map<string,int>)
+    is_numeric, is_date, is_string = classify_documented_type(documented_type)
     
-    print(f"DEBUG {field_name}: documented_type='{documented_type}', is_numeric={is_numeric}, is_string={is_string}, row_length={len(row)}")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("%s: documented_type='%s', is_numeric=%s, is_string=%s, row_length=%d",
+                     field_name, documented_type, is_numeric, is_string, row_len)
     
-    # Base columns (always present) - positions 0-14
     result = {
-        "catalog_name": row[0] if len(row) > 0 else None,
-        "schema_name": row[1] if len(row) > 1 else None,
-        "table_name": row[2] if len(row) > 2 else None,
-        "column_name": row[3] if len(row) > 3 else None,
-        "documented_type": row[4] if len(row) > 4 else None,
-        "total_rows": to_int(row[5]) if len(row) > 5 else 0,
-        "non_null_count": to_int(row[6]) if len(row) > 6 else 0,
-        "null_count": to_int(row[7]) if len(row) > 7 else 0,
-        "null_percentage": to_float(row[8]) if len(row) > 8 else 0.0,
-        "unique_count": to_int(row[9]) if len(row) > 9 else 0,
-        "cardinality_pct": to_float(row[10]) if len(row) > 10 else 0.0,
-        "unique_percentage": to_float(row[11]) if len(row) > 11 else 0.0,
-        "duplicate_percentage": to_float(row[12]) if len(row) > 12 else 0.0,
-        "is_categorical": to_bool(row[13]) if len(row) > 13 else False,
-        "captured_values_count": to_int(row[14]) if len(row) > 14 else 0,
+        name: convert(row[idx]) if idx < row_len else default
+        for idx, (name, convert, default) in enumerate(_BASE_SCHEMA)
     }
+    pos = len(_BASE_SCHEMA)
     
-    # Position tracking for conditional fields
-    pos = 15
-    
-    # String-specific fields (avg_length, min_length, max_length, median_length)
-    if is_string and len(row) > pos + 3:
-        result["avg_length"] = to_float(row[pos])
-        result["min_length"] = to_float(row[pos + 1])
-        result["max_length"] = to_float(row[pos + 2])
-        result["median_length"] = to_float(row[pos + 3])
-        pos += 4
-    
-    # Numeric-specific fields (min, max, mean, stddev, median, p25, p75, p95, p99, zeros, negatives, infinites)
-    if is_numeric and len(row) > pos + 11:
-        result["min_value"] = to_float(row[pos], None)
-        result["max_value"] = to_float(row[pos + 1], None)
-        result["mean_value"] = to_float(row[pos + 2], None)
-        result["stddev_value"] = to_float(row[pos + 3], None)
-        result["median_value"] = to_float(row[pos + 4], None)
-        result["p25_value"] = to_float(row[pos + 5], None)
-        result["p75_value"] = to_float(row[pos + 6], None)
-        result["p95_value"] = to_float(row[pos + 7], None)
-        result["p99_value"] = to_float(row[pos + 8], None)
-        result["zeros_count"] = to_int(row[pos + 9])
-        result["negatives_count"] = to_int(row[pos + 10])
-        result["infinite_count"] = to_int(row[pos + 11])
-        pos += 12
-        print(f"DEBUG {field_name} numeric stats: min={result['min_value']}, max={result['max_value']}, mean={result['mean_value']}, zeros={result['zeros_count']}, negatives={result['negatives_count']}")
-    else:
-        print(f"DEBUG {field_name}: SKIPPED numeric stats (is_numeric={is_numeric}, row_length={len(row)}, needed={pos + 12})")
-    
-    # Date-specific fields (min_date, max_date)
-    if is_date and len(row) > pos + 1:
-        result["min_date"] = row[pos]  # Keep as string
-        result["max_date"] = row[pos + 1]  # Keep as string
-        pos += 2
-    
-    # Always present: inferred_type, type_confidence_pct, top_values, all_values
-    if len(row) > pos:
-        result["inferred_type"] = row[pos]
-        pos += 1
-    if len(row) > pos:
-        result["type_confidence_pct"] = to_float(row[pos])
-        pos += 1
-    if len(row) > pos:
-        # Parse JSON string to array and convert numeric fields
-        top_values_str = row[pos]
-        try:
-            top_values = json.loads(top_values_str) if isinstance(top_values_str, str) else top_values_str
-            # Convert frequency and frequency_pct to numbers
-            if isinstance(top_values, list):
-                for item in top_values:
-                    if isinstance(item, dict):
-                        if 'frequency' in item:
-                            item['frequency'] = to_int(item['frequency'])
-                        if 'frequency_pct' in item:
-                            item['frequency_pct'] = to_float(item['frequency_pct'])
-            result["top_values"] = top_values
-        except:
-            result["top_values"] = []
-        pos += 1
-    if len(row) > pos:
-        # Parse JSON string to array and convert numeric fields
-        all_values_str = row[pos]
-        try:
-            all_values = json.loads(all_values_str) if isinstance(all_values_str, str) else all_values_str
-            # Convert frequency and frequency_pct to numbers
-            if isinstance(all_values, list):
-                for item in all_values:
-                    if isinstance(item, dict):
-                        if 'frequency' in item:
-                            item['frequency'] = to_int(item['frequency'])
-                        if 'frequency_pct' in item:
-                            item['frequency_pct'] = to_float(item['frequency_pct'])
-            result["all_values"] = all_values
-        except:
-            result["all_values"] = []
-        pos += 1
+    # Type-specific blocks are only present in full for the matching types
+    if is_string and row_len >= pos + len(_STRING_SCHEMA):
+        pos = _apply_schema(result, row, pos, _STRING_SCHEMA)
     
-    # patterns (always present now, but may be NULL for non-strings)
-    if len(row) > pos:
-        patterns_str = row[pos]
-        try:
-            patterns = json.loads(patterns_str) if isinstance(patterns_str, str) else patterns_str
-            # Convert pattern_count and avg_pattern_length to numbers
-            if isinstance(patterns, list):
-                for item in patterns:
-                    if isinstance(item, dict):
-                        if 'pattern_count' in item:
-                            item['pattern_count'] = to_int(item['pattern_count'])
-                        if 'avg_pattern_length' in item:
-                            item['avg_pattern_length'] = to_float(item['avg_pattern_length'])
-            result["patterns"] = patterns if patterns else []
-        except:
-            result["patterns"] = []
-        pos += 1
+    if is_numeric and row_len >= pos + len(_NUMERIC_SCHEMA):
+        pos = _apply_schema(result, row, pos, _NUMERIC_SCHEMA)
+        if debug:
+            logger.debug("%s numeric stats: min=%s, max=%s, mean=%s, zeros=%s, negatives=%s",
+                         field_name, result['min_value'], result['max_value'], result['mean_value'],
+                         result['zeros_count'], result['negatives_count'])
+    elif debug:
+        logger.debug("%s: SKIPPED numeric stats (is_numeric=%s, row_length=%d, needed=%d)",
+                     field_name, is_numeric, row_len, pos + len(_NUMERIC_SCHEMA))
     
-    # smallest_values (numeric only, but always present as NULL for non-numeric)
-    if len(row) > pos:
-        smallest_str = row[pos]
-        try:
-            smallest = json.loads(smallest_str) if isinstance(smallest_str, str) else smallest_str
-            if isinstance(smallest, list):
-                # Sort by 'rn' field to ensure correct order (smallest first)
-                sorted_smallest = sorted([item for item in smallest if isinstance(item, dict) and item.get('value') is not None], 
-                                        key=lambda x: x.get('rn', 999))
-                result["smallest_values"] = [to_float(item.get('value')) for item in sorted_smallest]
-            else:
-                result["smallest_values"] = []
-        except:
-            result["smallest_values"] = []
-        pos += 1
+    if is_date and row_len >= pos + len(_DATE_SCHEMA):
+        pos = _apply_schema(result, row, pos, _DATE_SCHEMA)
     
-    # largest_values (numeric only, but always present as NULL for non-numeric)
-    if len(row) > pos:
-        largest_str = row[pos]
-        try:
-            largest = json.loads(largest_str) if isinstance(largest_str, str) else largest_str
-            if isinstance(largest, list):
-                # Sort by 'rn' field to ensure correct order (largest first)
-                sorted_largest = sorted([item for item in largest if isinstance(item, dict) and item.get('value') is not None],
-                                       key=lambda x: x.get('rn', 999))
-                result["largest_values"] = [to_float(item.get('value')) for item in sorted_largest]
-            else:
-                result["largest_values"] = []
-        except:
-            result["largest_values"] = []
+    # Trailing fields are filled for as many columns as the row has
+    for name, convert in _TRAILING_SCHEMA[:max(row_len - pos, 0)]:
+        result[name] = convert(row[pos])
         pos += 1
     
-    # first_samples (always present)
-    if len(row) > pos:
-        first_samples_str = row[pos]
-        try:
-            first_samples = json.loads(first_samples_str) if isinstance(first_samples_str, str) else first_samples_str
-            if isinstance(first_samples, list):
-                # Sort by 'sample_rn' to maintain order
-                sorted_first = sorted([item for item in first_samples if isinstance(item, dict) and item.get('sample_value') is not None],
-                                     key=lambda x: x.get('sample_rn', 999))
-                result["first_samples"] = [str(item.get('sample_value')) for item in sorted_first]
-            else:
-                result["first_samples"] = []
-        except:
-            result["first_samples"] = []
-        pos += 1
+    # Log what was extracted for debugging
+    if debug:
+        stats_summary = []
+        if result.get('min_value') is not None:
+            stats_summary.append(f"min={result['min_value']}")
+        if result.get('max_value') is not None:
+            stats_summary.append(f"max={result['max_value']}")
+        if result.get('mean_value') is not None:
+            stats_summary.append(f"mean={result['mean_value']:.2f}")
+        
+        stats_str = ", ".join(stats_summary) if stats_summary else "no numeric stats"
+        logger.debug("Mapped %s (%s): %s", field_name, documented_type, stats_str)
     
-    # random_samples (always present)
-    if len(row) > pos:
-        random_samples_str = row[pos]
-        try:
-            random_samples = json.loads(random_samples_str) if isinstance(random_samples_str, str) else random_samples_str
-            if isinstance(random_samples, list):
-                # Sort by 'sample_rn' to maintain order
-                sorted_random = sorted([item for item in random_samples if isinstance(item, dict) and item.get('sample_value') is not None],
-                                      key=lambda x: x.get('sample_rn', 999))
-                result["random_samples"] = [str(item.get('sample_value')) for item in sorted_random]
-            else:
-                result["random_samples"] = []
-        except:
-            result["random_samples"] = []
-        pos += 1
+    return result
+
+
+@functools.lru_cache(maxsize=64)
+def _profiling_row_plan(columns: tuple) -> tuple:
+    """
+    Resolve the output fields for one labeled row layout: (name, converter, default, present)
+    Base columns come first (with defaults if absent), then the rest in SQL column order.
+    Profiling SQL only has a handful of layouts (string/numeric/date/other), so plans are reused
+    """
+    present = set(columns)
+    plan = [(name, convert, default, name in present) for name, convert, default in _BASE_SCHEMA]
+    base_names = {name for name, *_ in _BASE_SCHEMA}
+    plan.extend(
+        (name, _PROFILE_CONVERTERS.get(name, _identity), None, True)
+        for name in columns if name not in base_names
+    )
+    return tuple(plan)
+
+
+def map_profiling_row(row: dict, field_name: str) -> dict:
+    """
+    Convert a labeled profiling row (column name -> raw value) into typed values
+    Columns are matched by name, so the type-specific blocks need no position tracking
+    """
+    if not row:
+        return {}
     
-    # Log what was extracted for debugging
-    stats_summary = []
-    if 'min_value' in result and result['min_value'] is not None:
-        stats_summary.append(f"min={result['min_value']}")
-    if 'max_value' in result and result['max_value'] is not None:
-        stats_summary.append(f"max={result['max_value']}")
-    if 'mean_value' in result and result['mean_value'] is not None:
-        stats_summary.append(f"mean={result['mean_value']:.2f}")
+    result = {
+        name: convert(row[name]) if present else default
+        for name, convert, default, present in _profiling_row_plan(tuple(row))
+    }
     
-    stats_str = ", ".join(stats_summary) if stats_summary else "no numeric stats"
-    print(f"Mapped {field_name} ({documented_type}): {stats_str}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Mapped %s (%s): min=%s, max=%s, mean=%s", field_name, result.get("documented_type"),
+                     result.get("min_value"), result.get("max_value"), result.get("mean_value"))
     
     return result
 
 
-@api_app.post("/databricks/execute")
+def map_profiling_result(row, field_name: str) -> dict:
+    """Map a profiling row by name, falling back to positional mapping for unlabeled rows"""
+    if isinstance(row, dict):
+        return map_profiling_row(row, field_name)
+    return map_profiling_array_to_dict(row, field_name)
+
+
+# Max profiling statements a single request keeps in flight at once
+PROFILING_CONCURRENCY = int(os.getenv("PROFILING_CONCURRENCY", "8"))
+
+
+def profiling_error_result(query_obj: ProfilingQuery, error: Exception) -> dict:
+    """Result entry for a profiling query that failed"""
+    return {
+        "fieldKey": query_obj.fieldKey,
+        "description": query_obj.description,
+        "error": str(error),
+        "success": False
+    }
+
+
+def run_profiling_query(query_obj: ProfilingQuery) -> dict:
+    """Execute one profiling query and shape it into a result entry (blocking)"""
+    try:
+        sql_result = execute_sql(query_obj.query)
+        
+        if sql_result:
+            # Rows are labeled from the statement manifest, so columns map by name
+            data_dict = map_profiling_result(sql_result[0], query_obj.fieldKey)
+            
+            return {
+                "fieldKey": query_obj.fieldKey,
+                "description": query_obj.description,
+                "data": data_dict,
+                "success": True
+            }
+        return {
+            "fieldKey": query_obj.fieldKey,
+            "description": query_obj.description,
+            "data": None,
+            "success": True
+        }
+    
+    except Exception as e:
+        logger.exception("Error processing query %s", query_obj.fieldKey)
+        return profiling_error_result(query_obj, e)
+
+
+# Submit multi-query requests as UNION ALL statements (a batch that FAILS is re-run per query)
+BATCH_PROFILING_QUERIES = os.getenv("BATCH_PROFILING_QUERIES", "true").lower() in ("true", "1", "yes")
+# Queries per batched statement, so one bad query only costs its own batch a re-run
+PROFILING_BATCH_SIZE = int(os.getenv("PROFILING_BATCH_SIZE", "25"))
+# A batch gets a shorter budget than SQL_MAX_WAIT_S; when it runs out the batch's queries report the timeout
+BATCH_SQL_MAX_WAIT_S = float(os.getenv("BATCH_SQL_MAX_WAIT_S", "120"))
+
+
+def build_batched_sql(queries: List[ProfilingQuery]) -> str:
+    """
+    Combine independent profiling queries into a single UNION ALL statement
+    Each query's row is serialized with to_json(struct(*)) so queries with different
+    column sets share one result schema; __idx is the query's position in the request
+    """
+    parts = []
+    for idx, query_obj in enumerate(queries):
+        inner_sql = query_obj.query.strip().rstrip(';')
+        parts.append(
+            f"SELECT {idx} AS __idx, "
+            f"to_json(struct(*), map('ignoreNullFields', 'false')) AS payload "
+            f"FROM ({inner_sql}) t_{idx}"
+        )
+    return "\nUNION ALL\n".join(parts)
+
+
+def run_batched_profiling_queries(queries: List[ProfilingQuery]) -> List[dict]:
+    """Execute all profiling queries in one statement and split rows back per query (blocking)"""
+    payloads = {}
+    rows = execute_sql(build_batched_sql(queries), max_wait_s=BATCH_SQL_MAX_WAIT_S, return_format="arrays")["rows"]
+    for idx, payload in rows:
+        # Profiling queries return a single row - keep the first one like the per-query path
+        payloads.setdefault(int(idx), payload)
+    
+    results = []
+    for idx, query_obj in enumerate(queries):
+        payload = payloads.get(idx)
+        data_dict = None
+        if payload:
+            # to_json(struct(*)) keeps the column names, so the payload maps by name
+            data_dict = map_profiling_row(orjson.loads(payload), query_obj.fieldKey)
+        results.append({
+            "fieldKey": query_obj.fieldKey,
+            "description": query_obj.description,
+            "data": data_dict,
+            "success": True
+        })
+    return results
+
+
+@api_app.post("/databricks/execute", response_model=None, responses={200: {"model": QueryExecutionResponse}})
 async def execute_queries(
     request: QueryRequest
-) -> QueryExecutionResponse:
+):
     """
     Execute profiling queries using SQL Statements API
-    Handles both dict results (with metadata) and array results (without metadata)
+    Queries are submitted as batched statements of up to PROFILING_BATCH_SIZE; a batch that FAILS
+    is re-run as independent statements, while one that times out reports its error for each of
+    its queries instead of paying the wait twice. Statements run concurrently (bounded by
+    PROFILING_CONCURRENCY) and results keep the request order
     """
     try:
-        results = []
+        semaphore = asyncio.Semaphore(PROFILING_CONCURRENCY)
         
-        for query_obj in request.queries:
-            try:
-                # execute_sql returns either list of dicts or list of arrays
-                sql_result = execute_sql(query_obj.query)
-                
-                if sql_result and len(sql_result) > 0:
-                    row = sql_result[0]
-                    
-                    # Check if result is already a dict (has column metadata)
-                    if isinstance(row, dict):
-                        data_dict = row
-                        print(f"Using dict result for {query_obj.fieldKey}: {len(row)} fields")
-                    else:
-                        # Result is an array - use hardcoded mapping based on SQL structure
-                        data_dict = map_profiling_array_to_dict(row, query_obj.fieldKey)
-                    
-                    results.append({
-                        "fieldKey": query_obj.fieldKey,
-                        "description": query_obj.description,
-                        "data": data_dict,
-                        "success": True
-                    })
-                else:
-                    results.append({
-                        "fieldKey": query_obj.fieldKey,
-                        "description": query_obj.description,
-                        "data": None,
-                        "success": True
-                    })
-                
-            except Exception as e:
-                import traceback
-                error_details = traceback.format_exc()
-                print(f"Error processing query {query_obj.fieldKey}: {error_details}")
-                results.append({
-                    "fieldKey": query_obj.fieldKey,
-                    "description": query_obj.description,
-                    "error": str(e),
-                    "success": False
-                })
+        async def run_bounded(query_obj: ProfilingQuery) -> dict:
+            async with semaphore:
+                return await run_databricks_io(run_profiling_query, query_obj)
+        
+        async def run_batch(batch: List[ProfilingQuery]) -> List[dict]:
+            if len(batch) == 1:
+                return [await run_bounded(batch[0])]
+            async with semaphore:
+                try:
+                    return await run_databricks_io(run_batched_profiling_queries, batch)
+                except StatementFailed as e:
+                    if e.state != "FAILED":
+                        return [profiling_error_result(q, e) for q in batch]
+                    logger.warning("Batched profiling statement failed, running its %d queries individually: %s",
+                                   len(batch), e)
+                except Exception as e:
+                    logger.warning("Batched profiling statement of %d queries did not complete: %s", len(batch), e)
+                    return [profiling_error_result(q, e) for q in batch]
+            return list(await asyncio.gather(*(run_bounded(q) for q in batch)))
         
-        return QueryExecutionResponse(
-            results=results,
+        queries = request.queries
+        batch_size = PROFILING_BATCH_SIZE if BATCH_PROFILING_QUERIES else 1
+        batches = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+        batch_results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        
+        return model_response(QueryExecutionResponse.model_construct(
+            results=[result for results in batch_results for result in results],
             success=True,
             message="Queries executed successfully"
-        )
+        ))
     
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         print(f"Fatal error executing queries: {error_details}")
         raise HTTPException(
@@ -613,81 +1217,52 @@ async def execute_queries(
 async def execute_queries_stream(request: QueryRequest):
     """
     Execute profiling queries with real-time progress updates (streaming)
-    Sends progress updates as each query completes using Server-Sent Events
+    Queries run concurrently (bounded by PROFILING_CONCURRENCY) and a progress event is sent
+    as each one completes; result events are released in request order because the UI
+    pairs results with columns by position
     """
     async def generate_progress():
+        semaphore = asyncio.Semaphore(PROFILING_CONCURRENCY)
+        # Bounded so workers pause if the client reads slower than queries finish
+        out_queue: asyncio.Queue = asyncio.Queue(maxsize=PROFILING_CONCURRENCY * 2)
+        
+        async def run_indexed(idx: int, query_obj: ProfilingQuery):
+            async with semaphore:
+                result = await run_databricks_io(run_profiling_query, query_obj)
+            await out_queue.put((idx, result))
+        
+        tasks = [asyncio.create_task(run_indexed(idx, q)) for idx, q in enumerate(request.queries)]
         try:
             total_queries = len(request.queries)
             results = []
+            finished = {}
             
-            for idx, query_obj in enumerate(request.queries):
+            for completed in range(1, total_queries + 1):
+                idx, result = await out_queue.get()
+                query_obj = request.queries[idx]
+                
                 # Send progress update
                 progress_data = {
                     "type": "progress",
-                    "current": idx + 1,
+                    "current": completed,
                     "total": total_queries,
                     "fieldKey": query_obj.fieldKey,
                     "description": query_obj.description,
-                    "percentage": round(((idx + 1) / total_queries) * 100, 1)
+                    "percentage": round((completed / total_queries) * 100, 1)
                 }
-                yield f"data: {json.dumps(progress_data)}\n\n"
+                yield b"data: " + orjson.dumps(progress_data) + b"\n\n"
                 
-                try:
-                    # Execute the query
-                    sql_result = execute_sql(query_obj.query)
-                    
-                    if sql_result and len(sql_result) > 0:
-                        row = sql_result[0]
-                        
-                        # Check if result is already a dict (has column metadata)
-                        if isinstance(row, dict):
-                            data_dict = row
-                        else:
-                            # Result is an array - use hardcoded mapping
-                            data_dict = map_profiling_array_to_dict(row, query_obj.fieldKey)
-                        
-                        result = {
-                            "fieldKey": query_obj.fieldKey,
-                            "description": query_obj.description,
-                            "data": data_dict,
-                            "success": True
-                        }
-                    else:
-                        result = {
-                            "fieldKey": query_obj.fieldKey,
-                            "description": query_obj.description,
-                            "data": None,
-                            "success": True
-                        }
-                    
+                # Send result updates for every query that is now next in request order
+                # (failed queries carry success=False and the error)
+                finished[idx] = result
+                while len(results) in finished:
+                    result = finished.pop(len(results))
                     results.append(result)
-                    
-                    # Send result update
                     result_data = {
                         "type": "result",
                         "result": result
                     }
-                    yield f"data: {json.dumps(result_data)}\n\n"
-                    
-                except Exception as e:
-                    import traceback
-                    error_details = traceback.format_exc()
-                    print(f"Error processing query {query_obj.fieldKey}: {error_details}")
-                    
-                    error_result = {
-                        "fieldKey": query_obj.fieldKey,
-                        "description": query_obj.description,
-                        "error": str(e),
-                        "success": False
-                    }
-                    results.append(error_result)
-                    
-                    # Send error update
-                    error_data = {
-                        "type": "result",
-                        "result": error_result
-                    }
-                    yield f"data: {json.dumps(error_data)}\n\n"
+                    yield b"data: " + orjson.dumps(result_data) + b"\n\n"
             
             # Send completion message
             complete_data = {
@@ -695,16 +1270,19 @@ async def execute_queries_stream(request: QueryRequest):
                 "results": results,
                 "total": len(results)
             }
-            yield f"data: {json.dumps(complete_data)}\n\n"
+            yield b"data: " + orjson.dumps(complete_data) + b"\n\n"
             
         except Exception as e:
-            import traceback
             print(f"Error in execute_queries_stream: {traceback.format_exc()}")
             error_data = {
                 "type": "error",
                 "error": str(e)
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield b"data: " + orjson.dumps(error_data) + b"\n\n"
+        finally:
+            # Stop queued queries if the client disconnects mid-stream
+            for task in tasks:
+                task.cancel()
     
     return StreamingResponse(
         generate_progress(),
@@ -717,11 +1295,95 @@ async def execute_queries_stream(request: QueryRequest):
     )
 
 
+# Databricks statement ids are UUID-style hex strings; anything else would be spliced into the API path
+_STATEMENT_ID_RE = re.compile(r"[0-9a-fA-F-]{8,64}")
+
+
+class SubmitQueryRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    query: str
+
+
+# Upper bound (seconds) for ?wait= long-polling on the query endpoints
+_MAX_LONG_POLL_S = 30
+
+
+def _check_statement_id(statement_id: str):
+    """Reject statement ids that aren't plain hex/dash strings"""
+    if not _STATEMENT_ID_RE.fullmatch(statement_id):
+        raise HTTPException(status_code=400, detail="Invalid statement id")
+
+
+def _fetch_statement(statement_id: str, wait: int) -> dict:
+    """Fetch a statement, holding up to `wait` seconds server-side for it to finish (blocking)"""
+    deadline = time.monotonic() + min(max(wait, 0), _MAX_LONG_POLL_S)
+    return wait_for_statement(get_statement(statement_id), deadline)
+
+
+@api_app.post("/queries/submit")
+async def submit_query(request: SubmitQueryRequest):
+    """
+    Submit a query and return its statement id without waiting for completion
+    Poll /queries/{id}/status, then fetch rows from /queries/{id}/result
+    """
+    try:
+        statement = await run_databricks_io(submit_statement, request.query, "5s")
+        return {
+            "statement_id": statement.get("statement_id"),
+            "state": statement_state(statement)
+        }
+    except Exception as e:
+        logger.exception("Error submitting query")
+        raise HTTPException(status_code=500, detail=f"Error submitting query: {str(e)}")
+
+
+@api_app.get("/queries/{statement_id}/status")
+async def get_query_status(statement_id: str, wait: int = 0):
+    """
+    Get the current state of a submitted query
+    With wait=N (max 30) the request long-polls until the query finishes or N seconds pass,
+    so clients can re-connect immediately instead of polling on a timer
+    """
+    _check_statement_id(statement_id)
+    try:
+        statement = await run_databricks_io(_fetch_statement, statement_id, wait)
+        status = statement.get("status") or {}
+        return {
+            "statement_id": statement_id,
+            "state": status.get("state"),
+            "error": status.get("error")
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching query status: {str(e)}")
+
+
+@api_app.get("/queries/{statement_id}/result")
+async def get_query_result(statement_id: str, wait: int = 0):
+    """Get the rows of a finished query (state only while it is still running); supports wait= like /status"""
+    _check_statement_id(statement_id)
+    try:
+        statement = await run_databricks_io(_fetch_statement, statement_id, wait)
+        status = statement.get("status") or {}
+        state = status.get("state")
+        if state not in _TERMINAL_STATES:
+            return {"statement_id": statement_id, "state": state}
+        if state != "SUCCEEDED":
+            raise HTTPException(status_code=400, detail=f"Query {state.lower()}: {status.get('error')}")
+        
+        rows = await run_databricks_io(statement_rows, statement, "arrays")
+        return {"statement_id": statement_id, "state": state, **rows}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching query result: {str(e)}")
+
+
 @api_app.get("/catalogs")
 async def list_catalogs():
     """DEPRECATED - Use /api/catalogs instead. List all available catalogs"""
     try:
-        data = execute_sql("SHOW CATALOGS")
+        data = await cached_execute_sql(("show-catalogs",), "SHOW CATALOGS")
         # SHOW CATALOGS returns: catalog
         catalogs = [row.get("catalog", list(row.values())[0]) if isinstance(row, dict) else str(row) for row in data]
         return {"catalogs": catalogs}
@@ -733,7 +1395,7 @@ async def list_catalogs():
 async def list_schemas(catalog: str):
     """DEPRECATED - Use /api/schemas?catalog=X instead. List schemas in a catalog"""
     try:
-        data = execute_sql(f"SHOW SCHEMAS IN `{catalog}`")
+        data = await cached_execute_sql(("show-schemas", catalog), f"SHOW SCHEMAS IN `{catalog}`")
         # SHOW SCHEMAS returns: databaseName
         schemas = [row.get("databaseName", list(row.values())[0]) if isinstance(row, dict) else str(row) for row in data if (row.get("databaseName") if isinstance(row, dict) else row) != "information_schema"]
         return {"schemas": schemas}
@@ -745,7 +1407,7 @@ async def list_schemas(catalog: str):
 async def list_tables(catalog: str, schema: str):
     """DEPRECATED - Use /api/tables?catalog=X&schema=Y instead. List tables in a schema"""
     try:
-        data = execute_sql(f"SHOW TABLES IN `{catalog}`.`{schema}`")
+        data = await cached_execute_sql(("show-tables", catalog, schema), f"SHOW TABLES IN `{catalog}`.`{schema}`")
         # SHOW TABLES returns: database, tableName, isTemporary
         tables = [row.get("tableName", list(row.values())[1] if len(row.values()) > 1 else list(row.values())[0]) if isinstance(row, dict) else str(row) for row in data]
         return {"tables": tables}
@@ -763,172 +1425,322 @@ ui_app = FastAPI()
 # This ensures all API calls go to /api/* and UI handles the rest
 ui_app.mount("/api", api_app)
 
+
+# Startup events of mounted apps don't run, so worker-level hooks are registered on ui_app
+@ui_app.on_event("startup")
+async def warm_up_databricks():
+    """Prime the token cache and connection pool so the first user request skips setup"""
+    try:
+        await run_databricks_io(warm_up_connection)
+    except Exception:
+        logger.warning("Databricks warm-up failed (will retry on first request)", exc_info=True)
+
+
+async def refresh_catalogs_loop():
+    """
+    Re-query the catalog list every CATALOG_REFRESH_S so /catalogs and /catalog-tree serve from memory
+    Refreshes pause while nothing reads the list, so an idle app lets the warehouse auto-stop
+    """
+    while True:
+        try:
+            await fetch_catalogs(refresh=True)
+        except Exception:
+            logger.warning("Catalog cache refresh failed", exc_info=True)
+        while True:
+            await asyncio.sleep(CATALOG_REFRESH_S)
+            if time.monotonic() - _CATALOGS_LAST_READ < CATALOG_REFRESH_S:
+                break
+
+
+_BACKGROUND_TASKS: set = set()
+
+
+@ui_app.on_event("startup")
+async def start_catalog_refresh():
+    """Warm the catalog cache at startup and keep it fresh in the background while it is in use"""
+    task = asyncio.create_task(refresh_catalogs_loop())
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+@ui_app.on_event("shutdown")
+async def stop_background_tasks():
+    """Cancel background refresh tasks on worker shutdown"""
+    for task in list(_BACKGROUND_TASKS):
+        task.cancel()
+
+
+# Excel cell formats (XlsxWriter formats belong to a workbook, so these specs are added per export)
+_HEADER_FORMAT = {"bg_color": "#4472C4", "font_color": "#FFFFFF", "bold": True, "align": "center", "valign": "vcenter"}
+_TITLE_FORMAT = {"bold": True, "font_size": 14}
+
+# constant_memory flushes each row as soon as the next one starts, so rows must be written in order.
+# Profile values are written as-is: no formula/URL detection on strings, NaN/inf become error cells
+_WORKBOOK_OPTIONS = {
+    "constant_memory": True,
+    "strings_to_formulas": False,
+    "strings_to_urls": False,
+    "nan_inf_to_errors": True,
+}
+
+# Excel generation is pure CPU, so it runs in worker processes to keep the event loop free
+EXCEL_EXPORT_WORKERS = int(os.getenv("EXCEL_EXPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+_XLSX_POOL: Optional[ProcessPoolExecutor] = None
+# Smaller profiles build on a thread instead; pickling the payload to a process costs more than it saves
+EXCEL_INLINE_MAX_COLUMNS = int(os.getenv("EXCEL_INLINE_MAX_COLUMNS", "50"))
+
+
+def _get_xlsx_pool() -> ProcessPoolExecutor:
+    """
+    Create the export process pool on first use (after gunicorn has forked the worker)
+    Children come from a forkserver rather than forking this multi-threaded worker, so they never
+    inherit held locks or open HTTP sessions
+    """
+    global _XLSX_POOL
+    if _XLSX_POOL is None:
+        _XLSX_POOL = ProcessPoolExecutor(
+            max_workers=EXCEL_EXPORT_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+        )
+    return _XLSX_POOL
+
+
+def _discard_xlsx_pool(pool: ProcessPoolExecutor):
+    """Drop a broken export pool (e.g. a child was OOM-killed) so the next export starts a fresh one"""
+    global _XLSX_POOL
+    if _XLSX_POOL is pool:
+        _XLSX_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def build_xlsx_in_pool(profile_data: Dict[str, Any], path: str):
+    """Build the workbook in the export process pool, restarting the pool and retrying once if it broke"""
+    loop = asyncio.get_running_loop()
+    pool = _get_xlsx_pool()
+    try:
+        await loop.run_in_executor(pool, _build_xlsx, profile_data, path)
+    except BrokenProcessPool:
+        logger.warning("Excel export pool broke, restarting it and retrying", exc_info=True)
+        _discard_xlsx_pool(pool)
+        await loop.run_in_executor(_get_xlsx_pool(), _build_xlsx, profile_data, path)
+
+
+@ui_app.on_event("shutdown")
+async def stop_xlsx_pool():
+    """Stop the export worker processes on worker shutdown"""
+    if _XLSX_POOL is not None:
+        _XLSX_POOL.shutdown(cancel_futures=True)
+
+
+# Samples/extremes are long free-form values that mostly hit the width cap, so those sheets use fixed widths
+_SAMPLE_COLUMN_WIDTHS = ((0, 1, 24), (2, 11, 20))
+_EXTREME_COLUMN_WIDTHS = ((0, 1, 24), (2, 6, 20))
+
+
+def _field(key: str, default=None):
+    """Extractor for one attribute of a profiled column"""
+    return lambda col_data: col_data.get(key, default)
+
+
+_null_pct = _field("nullPct", 0)
+
+
+# "Detailed Profiling" sheet layout: (header, extractor) per spreadsheet column; derived columns are
+# (Excel formula template over the same row, extractor for its cached result) instead, so they follow
+# edits to Null % while viewers that don't recalculate still show the computed value
+_DETAILED_COLUMNS = (
+    ("Catalog", _field("catalog", "")),
+    ("Schema", _field("schema", "")),
+    ("Table", _field("table", "")),
+    ("Column Name", _field("name", "")),
+    ("Data Type", _field("documentedType", "")),
+    ("Inferred Type", _field("inferredType", "")),
+    ("Unique Values", _field("uniqueValues", 0)),
+    ("Unique %", _field("uniquePct", 0)),
+    ("Nulls", _field("nulls", 0)),
+    ("Null %", _null_pct),
+    ("Completeness %", ("=100-{null_pct}", lambda col_data: 100 - _null_pct(col_data))),
+    ("Min Value", _field("minValue", "")),
+    ("Max Value", _field("maxValue", "")),
+    ("Mean", _field("mean")),
+    ("Median", _field("median")),
+    ("Std Dev", _field("stddev")),
+    ("Min Length", _field("minLength")),
+    ("Max Length", _field("maxLength")),
+    ("Avg Length", _field("avgLength")),
+    ("Zeros", _field("zerosCount")),
+    ("Negatives", _field("negativesCount")),
+    ("Infinites", _field("infiniteCount")),
+    # Calculate quality score (simplified)
+    ("Quality Score", ("=100-MIN({null_pct},30)", lambda col_data: 100 - min(_null_pct(col_data), 30))),
+)
+_DETAILED_HEADERS = [header for header, _ in _DETAILED_COLUMNS]
+_DETAILED_EXTRACTORS = tuple(spec if callable(spec) else spec[1] for _, spec in _DETAILED_COLUMNS)
+_NULL_PCT_CELL = xl_col_to_name(_DETAILED_HEADERS.index("Null %")) + "{row}"
+_DETAILED_FORMULAS = tuple(
+    (col, spec[0].format(null_pct=_NULL_PCT_CELL))
+    for col, (_, spec) in enumerate(_DETAILED_COLUMNS) if not callable(spec)
+)
+
+
+def _as_text(value: Any, texts: Dict[tuple, str]) -> str:
+    """str() a cell value once per export; keyed by type so 1, 1.0 and True stay distinct"""
+    key = (type(value), value)
+    try:
+        text = texts.get(key)
+    except TypeError:
+        return str(value)  # unhashable value, nothing to cache
+    if text is None:
+        text = texts[key] = str(value)
+    return text
+
+
+def _write_sheet(wb: xlsxwriter.Workbook, title: str, rows: List[list], first_row_format, texts: Dict[tuple, str],
+                 column_widths: Optional[tuple] = None, formulas: tuple = ()):
+    """
+    Write a complete sheet top to bottom, styling the first row (header or title)
+    Column widths (longest value + 2, capped at 50) are tracked while writing and applied afterwards,
+    reusing the export's cached str() of each value; sheets with fixed column_widths
+    ((first_col, last_col, width), ...) skip the tracking
+    formulas ((col, template), ...) are written below the first row with {row} set to the 1-based row number,
+    caching the row's own value in that column as the formula result
+    """
+    ws = wb.add_worksheet(title)
+    if column_widths is not None:
+        for first_col, last_col, width in column_widths:
+            ws.set_column(first_col, last_col, width)
+    
+    max_lengths = []
+    for row_idx, row in enumerate(rows):
+        ws.write_row(row_idx, 0, row, first_row_format if row_idx == 0 else None)
+        if row_idx:
+            for col, template in formulas:
+                ws.write_formula(row_idx, col, template.format(row=row_idx + 1), None, row[col])
+        if column_widths is not None:
+            continue
+        if len(row) > len(max_lengths):
+            max_lengths.extend([0] * (len(row) - len(max_lengths)))
+        for idx, value in enumerate(row):
+            if value is None:
+                continue
+            length = len(value) if type(value) is str else len(_as_text(value, texts))
+            if length > max_lengths[idx]:
+                max_lengths[idx] = length
+    
+    for idx, length in enumerate(max_lengths):
+        ws.set_column(idx, idx, min(length + 2, 50))
+
+
+def _build_xlsx(profile_data: Dict[str, Any], path: str):
+    """Build the multi-sheet profiling workbook and write the .xlsx to path"""
+    wb = xlsxwriter.Workbook(path, _WORKBOOK_OPTIONS)
+    # One Format per style, shared by every sheet, keeps the workbook's style table at two entries
+    header_format = wb.add_format(_HEADER_FORMAT)
+    title_format = wb.add_format(_TITLE_FORMAT)
+    texts: Dict[tuple, str] = {}
+    
+    # Sheet 1: Summary
+    summary_rows = [
+        ["Profile Summary", ""],
+        ["Total Columns", profile_data.get("totalColumns", 0)],
+        ["Total Rows", profile_data.get("totalRows", 0)],
+        ["Issues Found", profile_data.get("issuesFound", 0)],
+        ["Completeness %", profile_data.get("completeness", "0%")],
+        ["Quality Score", profile_data.get("qualityScore", "0%")],
+        ["High Cardinality Count", profile_data.get("highCardinalityCount", 0)],
+        ["Date Columns", profile_data.get("dateColumns", 0)],
+        ["Empty Columns", profile_data.get("emptyColumns", 0)],
+    ]
+    _write_sheet(wb, "Summary", summary_rows, title_format, texts)
+    
+    # Sheet 2: Detailed Column Data
+    columns = profile_data.get("columns", [])
+    detailed_rows = [_DETAILED_HEADERS]
+    detailed_rows.extend([extract(col_data) for extract in _DETAILED_EXTRACTORS] for col_data in columns)
+    _write_sheet(wb, "Detailed Profiling", detailed_rows, header_format, texts, formulas=_DETAILED_FORMULAS)
+    
+    # Sheet 3: Samples
+    sample_rows = [["Column Name", "Sample Type", "Sample 1", "Sample 2", "Sample 3",
+                    "Sample 4", "Sample 5", "Sample 6", "Sample 7", "Sample 8", "Sample 9", "Sample 10"]]
+    for col_data in columns:
+        # First samples
+        first_samples = col_data.get("firstSamples", [])
+        if first_samples:
+            sample_rows.append([col_data.get("name", ""), "First 10"] + [_as_text(sample, texts) for sample in first_samples[:10]])
+        
+        # Random samples
+        random_samples = col_data.get("randomSamples", [])
+        if random_samples:
+            sample_rows.append([col_data.get("name", ""), "Random 10"] + [_as_text(sample, texts) for sample in random_samples[:10]])
+    if len(sample_rows) > 1:  # no sheet when no column has samples
+        _write_sheet(wb, "Sample Values", sample_rows, header_format, texts, _SAMPLE_COLUMN_WIDTHS)
+    
+    # Sheet 4: Extreme Values
+    extreme_rows = [["Column Name", "Value Type", "Value 1", "Value 2", "Value 3", "Value 4", "Value 5"]]
+    for col_data in columns:
+        # Smallest values
+        smallest = col_data.get("smallestValues", [])
+        if smallest:
+            extreme_rows.append([col_data.get("name", ""), "Smallest"] + list(smallest[:5]))
+        
+        # Largest values
+        largest = col_data.get("largestValues", [])
+        if largest:
+            extreme_rows.append([col_data.get("name", ""), "Largest"] + list(largest[:5]))
+    if len(extreme_rows) > 1:  # no sheet when no column has extreme values
+        _write_sheet(wb, "Extreme Values", extreme_rows, header_format, texts, _EXTREME_COLUMN_WIDTHS)
+    
+    wb.close()
+
+
+def _remove_file(path: str):
+    """Delete a file if it still exists"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class TempFileResponse(FileResponse):
+    """FileResponse for a temp file that is deleted when the response ends, however it ends"""
+    
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            _remove_file(self.path)
+
+
 @api_app.post("/export/excel")
 async def export_to_excel(profile_data: Dict[str, Any]):
     """
     Export profiling results to Excel file with multiple sheets
     """
     try:
-        wb = Workbook()
-        wb.remove(wb.active)  # Remove default sheet
-        
-        # Define header styles
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        
-        # Sheet 1: Summary
-        ws_summary = wb.create_sheet("Summary")
-        summary_data = [
-            ["Profile Summary", ""],
-            ["Total Columns", profile_data.get("totalColumns", 0)],
-            ["Total Rows", profile_data.get("totalRows", 0)],
-            ["Issues Found", profile_data.get("issuesFound", 0)],
-            ["Completeness %", profile_data.get("completeness", "0%")],
-            ["Quality Score", profile_data.get("qualityScore", "0%")],
-            ["High Cardinality Count", profile_data.get("highCardinalityCount", 0)],
-            ["Date Columns", profile_data.get("dateColumns", 0)],
-            ["Empty Columns", profile_data.get("emptyColumns", 0)],
-        ]
-        for row_idx, row_data in enumerate(summary_data, 1):
-            for col_idx, cell_value in enumerate(row_data, 1):
-                cell = ws_summary.cell(row=row_idx, column=col_idx, value=cell_value)
-                if row_idx == 1:
-                    cell.font = Font(bold=True, size=14)
-        
-        # Sheet 2: Detailed Column Data
-        ws_detailed = wb.create_sheet("Detailed Profiling")
-        detailed_headers = [
-            "Catalog", "Schema", "Table", "Column Name", "Data Type", "Inferred Type",
-            "Unique Values", "Unique %", "Nulls", "Null %", "Completeness %",
-            "Min Value", "Max Value", "Mean", "Median", "Std Dev",
-            "Min Length", "Max Length", "Avg Length",
-            "Zeros", "Negatives", "Infinites",
-            "Quality Score"
-        ]
-        
-        for col_idx, header in enumerate(detailed_headers, 1):
-            cell = ws_detailed.cell(row=1, column=col_idx, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        columns = profile_data.get("columns", [])
-        for row_idx, col_data in enumerate(columns, 2):
-            ws_detailed.cell(row=row_idx, column=1, value=col_data.get("catalog", ""))
-            ws_detailed.cell(row=row_idx, column=2, value=col_data.get("schema", ""))
-            ws_detailed.cell(row=row_idx, column=3, value=col_data.get("table", ""))
-            ws_detailed.cell(row=row_idx, column=4, value=col_data.get("name", ""))
-            ws_detailed.cell(row=row_idx, column=5, value=col_data.get("documentedType", ""))
-            ws_detailed.cell(row=row_idx, column=6, value=col_data.get("inferredType", ""))
-            ws_detailed.cell(row=row_idx, column=7, value=col_data.get("uniqueValues", 0))
-            ws_detailed.cell(row=row_idx, column=8, value=col_data.get("uniquePct", 0))
-            ws_detailed.cell(row=row_idx, column=9, value=col_data.get("nulls", 0))
-            ws_detailed.cell(row=row_idx, column=10, value=col_data.get("nullPct", 0))
-            ws_detailed.cell(row=row_idx, column=11, value=100 - col_data.get("nullPct", 0))
-            ws_detailed.cell(row=row_idx, column=12, value=col_data.get("minValue", ""))
-            ws_detailed.cell(row=row_idx, column=13, value=col_data.get("maxValue", ""))
-            ws_detailed.cell(row=row_idx, column=14, value=col_data.get("mean"))
-            ws_detailed.cell(row=row_idx, column=15, value=col_data.get("median"))
-            ws_detailed.cell(row=row_idx, column=16, value=col_data.get("stddev"))
-            ws_detailed.cell(row=row_idx, column=17, value=col_data.get("minLength"))
-            ws_detailed.cell(row=row_idx, column=18, value=col_data.get("maxLength"))
-            ws_detailed.cell(row=row_idx, column=19, value=col_data.get("avgLength"))
-            ws_detailed.cell(row=row_idx, column=20, value=col_data.get("zerosCount"))
-            ws_detailed.cell(row=row_idx, column=21, value=col_data.get("negativesCount"))
-            ws_detailed.cell(row=row_idx, column=22, value=col_data.get("infiniteCount"))
-            # Calculate quality score (simplified)
-            quality = 100 - min(col_data.get("nullPct", 0), 30)
-            ws_detailed.cell(row=row_idx, column=23, value=quality)
-        
-        # Sheet 3: Samples
-        ws_samples = wb.create_sheet("Sample Values")
-        sample_headers = ["Column Name", "Sample Type", "Sample 1", "Sample 2", "Sample 3", 
-                         "Sample 4", "Sample 5", "Sample 6", "Sample 7", "Sample 8", "Sample 9", "Sample 10"]
-        
-        for col_idx, header in enumerate(sample_headers, 1):
-            cell = ws_samples.cell(row=1, column=col_idx, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        sample_row = 2
-        for col_data in columns:
-            # First samples
-            first_samples = col_data.get("firstSamples", [])
-            if first_samples:
-                ws_samples.cell(row=sample_row, column=1, value=col_data.get("name", ""))
-                ws_samples.cell(row=sample_row, column=2, value="First 10")
-                for idx, sample in enumerate(first_samples[:10], 3):
-                    ws_samples.cell(row=sample_row, column=idx, value=str(sample))
-                sample_row += 1
-            
-            # Random samples
-            random_samples = col_data.get("randomSamples", [])
-            if random_samples:
-                ws_samples.cell(row=sample_row, column=1, value=col_data.get("name", ""))
-                ws_samples.cell(row=sample_row, column=2, value="Random 10")
-                for idx, sample in enumerate(random_samples[:10], 3):
-                    ws_samples.cell(row=sample_row, column=idx, value=str(sample))
-                sample_row += 1
-        
-        # Sheet 4: Extreme Values
-        ws_extremes = wb.create_sheet("Extreme Values")
-        extreme_headers = ["Column Name", "Value Type", "Value 1", "Value 2", "Value 3", "Value 4", "Value 5"]
-        
-        for col_idx, header in enumerate(extreme_headers, 1):
-            cell = ws_extremes.cell(row=1, column=col_idx, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-        
-        extreme_row = 2
-        for col_data in columns:
-            # Smallest values
-            smallest = col_data.get("smallestValues", [])
-            if smallest:
-                ws_extremes.cell(row=extreme_row, column=1, value=col_data.get("name", ""))
-                ws_extremes.cell(row=extreme_row, column=2, value="Smallest")
-                for idx, val in enumerate(smallest[:5], 3):
-                    ws_extremes.cell(row=extreme_row, column=idx, value=val)
-                extreme_row += 1
-            
-            # Largest values
-            largest = col_data.get("largestValues", [])
-            if largest:
-                ws_extremes.cell(row=extreme_row, column=1, value=col_data.get("name", ""))
-                ws_extremes.cell(row=extreme_row, column=2, value="Largest")
-                for idx, val in enumerate(largest[:5], 3):
-                    ws_extremes.cell(row=extreme_row, column=idx, value=val)
-                extreme_row += 1
-        
-        # Auto-size columns for all sheets
-        for ws in wb.worksheets:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if cell.value:
-                            max_length = max(max_length, len(str(cell.value)))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to bytes
-        excel_buffer = io.BytesIO()
-        wb.save(excel_buffer)
-        excel_buffer.seek(0)
-        
-        return StreamingResponse(
-            excel_buffer,
+        # The workbook is written to a temp file and sent with sendfile; the file is removed when the
+        # response ends (sent, disconnected or failed)
+        with tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False) as tmp:
+            path = tmp.name
+        if len(profile_data.get("columns", [])) <= EXCEL_INLINE_MAX_COLUMNS:
+            build = asyncio.ensure_future(asyncio.to_thread(_build_xlsx, profile_data, path))
+        else:
+            build = asyncio.ensure_future(build_xlsx_in_pool(profile_data, path))
+        try:
+            await asyncio.shield(build)
+        except asyncio.CancelledError:
+            # The build keeps running in its thread/process - remove the file once it stops writing
+            build.add_done_callback(lambda _: _remove_file(path))
+            raise
+        except Exception:
+            _remove_file(path)
+            raise
+        
+        return TempFileResponse(
+            path,
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": "attachment; filename=data_profiling_report.xlsx"}
+            filename="data_profiling_report.xlsx"
         )
     
     except Exception as e:
-        import traceback
         print(f"Error creating Excel export: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error creating Excel export: {str(e)}")
 
@@ -937,8 +1749,14 @@ async def export_to_excel(profile_data: Dict[str, Any]):
 # Cross-Column Analysis Endpoints
 # ============================================================================
 
+# Pairwise aggregates are fused into one scan, split so a statement never carries more than this many
+_AGGREGATES_PER_QUERY = 200
+# Each COUNT(DISTINCT ...) expands the scan, so those are grouped more sparingly
+_DISTINCT_PAIRS_PER_QUERY = 16
+
+
 @api_app.post("/cross-column/correlations")
-async def calculate_correlations(request: dict):
+def calculate_correlations(request: dict):
     """
     Calculate correlation matrix for numeric columns.
     """
@@ -951,36 +1769,38 @@ async def calculate_correlations(request: dict):
         if len(numeric_fields) < 2:
             return {"correlations": [], "message": "Need at least 2 numeric columns"}
         
-        # Build correlation SQL
+        # All pairs (upper triangle) go into as few single-scan statements as possible
+        pairs = [(field1, field2) for i, field1 in enumerate(numeric_fields) for field2 in numeric_fields[i + 1:]]
         correlations = []
         
-        for i, field1 in enumerate(numeric_fields):
-            for j, field2 in enumerate(numeric_fields):
-                if i < j:  # Only calculate upper triangle
-                    sql = f"""
-                    SELECT 
-                        CORR(CAST(`{field1}` AS DOUBLE), CAST(`{field2}` AS DOUBLE)) as correlation
-                    FROM `{catalog}`.`{schema}`.`{table}`
-                    WHERE `{field1}` IS NOT NULL AND `{field2}` IS NOT NULL
-                    """
-                    
-                    result = execute_sql(sql)
-                    
-                    if result and len(result) > 0:
-                        row = result[0]
-                        corr_value = to_float(row.get('correlation') if isinstance(row, dict) else row[0])
-                        
-                        correlations.append({
-                            "field1": field1,
-                            "field2": field2,
-                            "correlation": corr_value if corr_value is not None else 0.0,
-                            "strength": get_correlation_strength(corr_value if corr_value else 0.0)
-                        })
+        for offset in range(0, len(pairs), _AGGREGATES_PER_QUERY):
+            chunk = pairs[offset:offset + _AGGREGATES_PER_QUERY]
+            select_exprs = ",\n                ".join(
+                f"CORR(CAST(`{field1}` AS DOUBLE), CAST(`{field2}` AS DOUBLE)) as c_{offset + k}"
+                for k, (field1, field2) in enumerate(chunk)
+            )
+            sql = f"""
+            SELECT 
+                {select_exprs}
+            FROM `{catalog}`.`{schema}`.`{table}`
+            """
+            
+            result = execute_sql(sql, return_format="arrays")["rows"]
+            if not result:
+                continue
+            
+            for (field1, field2), value in zip(chunk, result[0]):
+                corr_value = to_float(value)
+                correlations.append({
+                    "field1": field1,
+                    "field2": field2,
+                    "correlation": corr_value if corr_value is not None else 0.0,
+                    "strength": get_correlation_strength(corr_value if corr_value else 0.0)
+                })
         
         return {"correlations": correlations}
     
     except Exception as e:
-        import traceback
         print(f"Error calculating correlations: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1014,34 +1834,47 @@ async def detect_composite_keys(request: dict):
         if len(fields) < 2:
             return {"compositeKeys": [], "message": "Need at least 2 columns"}
         
-        # Get total row count
-        count_sql = f"SELECT COUNT(*) as total FROM `{catalog}`.`{schema}`.`{table}`"
-        count_result = execute_sql(count_sql)
-        total_rows = to_int(count_result[0].get('total') if isinstance(count_result[0], dict) else count_result[0][0])
+        # Check 2-column combinations: a few pairs per scan, scans issued concurrently.
+        # Each scan also returns the total row count, so no separate COUNT(*) pass is needed
+        pairs = [(field1, field2) for i, field1 in enumerate(fields) for field2 in fields[i + 1:]]
+        semaphore = asyncio.Semaphore(PROFILING_CONCURRENCY)
+        
+        async def count_distinct_pairs(offset: int) -> tuple:
+            chunk = pairs[offset:offset + _DISTINCT_PAIRS_PER_QUERY]
+            select_exprs = ",\n                ".join(
+                f"COUNT(DISTINCT `{field1}`, `{field2}`) as u_{offset + k}"
+                for k, (field1, field2) in enumerate(chunk)
+            )
+            sql = f"""
+            SELECT 
+                COUNT(*) as total,
+                {select_exprs}
+            FROM `{catalog}`.`{schema}`.`{table}`
+            """
+            async with semaphore:
+                result = await run_databricks_io(execute_sql, sql, return_format="arrays")
+            row = result["rows"][0]
+            return to_int(row[0]), list(zip(chunk, row[1:]))
+        
+        chunk_results = await asyncio.gather(
+            *[count_distinct_pairs(offset) for offset in range(0, len(pairs), _DISTINCT_PAIRS_PER_QUERY)]
+        )
         
+        total_rows = chunk_results[0][0]
         composite_keys = []
-        
-        # Check 2-column combinations
-        for i, field1 in enumerate(fields):
-            for j, field2 in enumerate(fields):
-                if i < j:
-                    sql = f"""
-                    SELECT COUNT(DISTINCT `{field1}`, `{field2}`) as unique_count
-                    FROM `{catalog}`.`{schema}`.`{table}`
-                    """
-                    
-                    result = execute_sql(sql)
-                    unique_count = to_int(result[0].get('unique_count') if isinstance(result[0], dict) else result[0][0])
-                    uniqueness_pct = (unique_count / total_rows * 100) if total_rows > 0 else 0
-                    
-                    if uniqueness_pct >= 95:  # Potential key if >= 95% unique
-                        composite_keys.append({
-                            "columns": [field1, field2],
-                            "uniqueCount": unique_count,
-                            "totalRows": total_rows,
-                            "uniquenessPct": round(uniqueness_pct, 2),
-                            "isPotentialKey": uniqueness_pct >= 99.9
-                        })
+        for _, chunk in chunk_results:
+            for (field1, field2), value in chunk:
+                unique_count = to_int(value)
+                uniqueness_pct = (unique_count / total_rows * 100) if total_rows > 0 else 0
+                
+                if uniqueness_pct >= 95:  # Potential key if >= 95% unique
+                    composite_keys.append({
+                        "columns": [field1, field2],
+                        "uniqueCount": unique_count,
+                        "totalRows": total_rows,
+                        "uniquenessPct": round(uniqueness_pct, 2),
+                        "isPotentialKey": uniqueness_pct >= 99.9
+                    })
         
         # Sort by uniqueness descending
         composite_keys.sort(key=lambda x: x["uniquenessPct"], reverse=True)
@@ -1049,13 +1882,12 @@ async def detect_composite_keys(request: dict):
         return {"compositeKeys": composite_keys[:10]}  # Top 10
     
     except Exception as e:
-        import traceback
         print(f"Error detecting composite keys: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_app.post("/cross-column/conditional-profiling")
-async def conditional_profiling(request: dict):
+def conditional_profiling(request: dict):
     """
     Profile numeric columns grouped by categorical columns.
     """
@@ -1086,35 +1918,23 @@ async def conditional_profiling(request: dict):
         SELECT * FROM stats
         """
         
-        result = execute_sql(sql)
+        result = execute_sql(sql, return_format="arrays")["rows"]
         
         conditional_stats = []
         for row in result:
-            if isinstance(row, dict):
-                conditional_stats.append({
-                    "category": str(row.get('category', '')),
-                    "count": to_int(row.get('count', 0)),
-                    "mean": to_float(row.get('mean_value', 0)),
-                    "stddev": to_float(row.get('stddev_value', 0)),
-                    "min": to_float(row.get('min_value', 0)),
-                    "max": to_float(row.get('max_value', 0)),
-                    "median": to_float(row.get('median_value', 0))
-                })
-            else:
-                conditional_stats.append({
-                    "category": str(row[0]),
-                    "count": to_int(row[1]),
-                    "mean": to_float(row[2]),
-                    "stddev": to_float(row[3]),
-                    "min": to_float(row[4]),
-                    "max": to_float(row[5]),
-                    "median": to_float(row[6])
-                })
+            conditional_stats.append({
+                "category": str(row[0]),
+                "count": to_int(row[1]),
+                "mean": to_float(row[2]),
+                "stddev": to_float(row[3]),
+                "min": to_float(row[4]),
+                "max": to_float(row[5]),
+                "median": to_float(row[6])
+            })
         
         return {"conditionalStats": conditional_stats}
     
     except Exception as e:
-        import traceback
         print(f"Error in conditional profiling: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1123,8 +1943,12 @@ async def conditional_profiling(request: dict):
 # Temporal Analysis Endpoint
 # ============================================================================
 
+# DAYOFWEEK() is 1-based starting on Sunday
+_DAY_NAMES = ("", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday")
+
+
 @api_app.post("/temporal/analyze")
-async def analyze_temporal_column(request: dict):
+def analyze_temporal_column(request: dict):
     """
     Analyze temporal patterns in a timestamp/date column.
     Returns day-of-week and hour-of-day distributions.
@@ -1135,69 +1959,31 @@ async def analyze_temporal_column(request: dict):
         table = request.get("table")
         column = request.get("column")
         
-        # Day of week analysis
-        dow_sql = f"""
-        WITH day_analysis AS (
-            SELECT 
-                DAYOFWEEK(`{column}`) as day_num,
-                CASE DAYOFWEEK(`{column}`)
-                    WHEN 1 THEN 'Sunday'
-                    WHEN 2 THEN 'Monday'
-                    WHEN 3 THEN 'Tuesday'
-                    WHEN 4 THEN 'Wednesday'
-                    WHEN 5 THEN 'Thursday'
-                    WHEN 6 THEN 'Friday'
-                    WHEN 7 THEN 'Saturday'
-                END as day_name,
-                COUNT(*) as count
-            FROM `{catalog}`.`{schema}`.`{table}`
-            WHERE `{column}` IS NOT NULL
-            GROUP BY DAYOFWEEK(`{column}`)
-            ORDER BY DAYOFWEEK(`{column}`)
-        )
-        SELECT day_name, count FROM day_analysis
+        # Day of week and hour of day from one scan: each row belongs to exactly one grouping set
+        temporal_sql = f"""
+        SELECT 
+            DAYOFWEEK(`{column}`) as day_num,
+            HOUR(`{column}`) as hour,
+            COUNT(*) as count
+        FROM `{catalog}`.`{schema}`.`{table}`
+        WHERE `{column}` IS NOT NULL
+        GROUP BY GROUPING SETS ((DAYOFWEEK(`{column}`)), (HOUR(`{column}`)))
+        ORDER BY day_num, hour
         """
         
-        dow_result = execute_sql(dow_sql)
+        temporal_result = execute_sql(temporal_sql, return_format="arrays")["rows"]
         day_of_week = []
-        for row in dow_result:
-            if isinstance(row, dict):
-                day_of_week.append({
-                    "day": row.get('day_name', ''),
-                    "count": to_int(row.get('count', 0))
-                })
-            else:
-                day_of_week.append({
-                    "day": str(row[0]),
-                    "count": to_int(row[1])
-                })
-        
-        # Hour of day analysis
-        hod_sql = f"""
-        WITH hour_analysis AS (
-            SELECT 
-                HOUR(`{column}`) as hour,
-                COUNT(*) as count
-            FROM `{catalog}`.`{schema}`.`{table}`
-            WHERE `{column}` IS NOT NULL
-            GROUP BY HOUR(`{column}`)
-            ORDER BY HOUR(`{column}`)
-        )
-        SELECT hour, count FROM hour_analysis
-        """
-        
-        hod_result = execute_sql(hod_sql)
         hour_of_day = []
-        for row in hod_result:
-            if isinstance(row, dict):
-                hour_of_day.append({
-                    "hour": to_int(row.get('hour', 0)),
-                    "count": to_int(row.get('count', 0))
+        for day_num, hour, count in temporal_result:
+            if day_num is not None:
+                day_of_week.append({
+                    "day": _DAY_NAMES[to_int(day_num)],
+                    "count": to_int(count)
                 })
-            else:
+            elif hour is not None:
                 hour_of_day.append({
-                    "hour": to_int(row[0]),
-                    "count": to_int(row[1])
+                    "hour": to_int(hour),
+                    "count": to_int(count)
                 })
         
         return {
@@ -1206,7 +1992,6 @@ async def analyze_temporal_column(request: dict):
         }
     
     except Exception as e:
-        import traceback
         print(f"Error analyzing temporal column: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1223,22 +2008,10 @@ async def generate_ai_insights(request: dict):
     try:
         column_data = request.get("columnData")
         
-        # Build prompt
-        prompt = f"""You are a data quality expert. Analyze this column profile and provide 3-5 actionable insights.
-
-Column: {column_data.get('name')}
-Data Type: {column_data.get('inferredType')} (documented: {column_data.get('documentedType')})
-Total Rows: {column_data.get('totalRows', 0):,}
-Null Values: {column_data.get('nulls', 0):,} ({column_data.get('nullPct', 0):.2f}%)
-Unique Values: {column_data.get('uniqueValues', 0):,} ({column_data.get('uniquePct', 0):.2f}%)
-Completeness: {column_data.get('completeness', 0):.2f}%
-Quality Score: {column_data.get('quality', 0)}/100
-
-"""
-        
-        # Add numeric stats if available
+        # Optional sections are built up front so the prompt is formatted in one pass
+        stats_block = ""
         if column_data.get('mean') is not None:
-            prompt += f"""Statistical Summary:
+            stats_block = f"""Statistical Summary:
 - Mean: {column_data.get('mean', 0):.2f}
 - Median: {column_data.get('median', 0):.2f}
 - Std Dev: {column_data.get('stddev', 0):.2f}
@@ -1249,13 +2022,24 @@ Quality Score: {column_data.get('quality', 0)}/100
 
 """
         
-        # Add top values
+        top_values_block = ""
         if column_data.get('topValues'):
-            prompt += "Top Values:\n"
-            for val in column_data.get('topValues', [])[:5]:
-                prompt += f"- {val.get('value')}: {val.get('count', 0):,} occurrences ({val.get('percentage', 0):.2f}%)\n"
+            top_values_block = "Top Values:\n" + "".join(
+                f"- {val.get('value')}: {val.get('count', 0):,} occurrences ({val.get('percentage', 0):.2f}%)\n"
+                for val in column_data.get('topValues', [])[:5]
+            )
         
-        prompt += """
+        prompt = f"""You are a data quality expert. Analyze this column profile and provide 3-5 actionable insights.
+
+Column: {column_data.get('name')}
+Data Type: {column_data.get('inferredType')} (documented: {column_data.get('documentedType')})
+Total Rows: {column_data.get('totalRows', 0):,}
+Null Values: {column_data.get('nulls', 0):,} ({column_data.get('nullPct', 0):.2f}%)
+Unique Values: {column_data.get('uniqueValues', 0):,} ({column_data.get('uniquePct', 0):.2f}%)
+Completeness: {column_data.get('completeness', 0):.2f}%
+Quality Score: {column_data.get('quality', 0)}/100
+
+{stats_block}{top_values_block}
 Provide insights in this format:
 1. [Icon] [Title]: [Description]
 2. [Icon] [Title]: [Description]
@@ -1273,8 +2057,10 @@ Focus on:
         
         # Call Databricks Foundation Models API
         try:
-            token = get_oauth_token()
-            endpoint_url = f"https://{os.getenv('DATABRICKS_SERVER_HOSTNAME')}/serving-endpoints/databricks-gemma-3-12b/invocations"
+            # The token is cached and the session keeps its connection alive; both calls
+            # can still block, so they run off the event loop
+            token = await run_databricks_io(get_oauth_token)
+            endpoint_url = f"https://{_WORKSPACE_HOST}/serving-endpoints/databricks-gemma-3-12b/invocations"
             
             headers = {
                 "Authorization": f"Bearer {token}",
@@ -1292,10 +2078,10 @@ Focus on:
                 "temperature": 0.7
             }
             
-            response = requests.post(endpoint_url, json=payload, headers=headers, timeout=30)
+            response = await run_databricks_io(_SESSION.post, endpoint_url, json=payload, headers=headers, timeout=30)
             
             if response.status_code == 200:
-                result = response.json()
+                result = orjson.loads(response.content)
                 insights_text = result.get('choices', [{}])[0].get('message', {}).get('content', '')
                 
                 return {
@@ -1319,64 +2105,79 @@ Focus on:
             }
     
     except Exception as e:
-        import traceback
         print(f"Error generating AI insights: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Non-zero null percentages: messages for < 5%, < 20% and the rest
+_NULL_PCT_THRESHOLDS = (5, 20)
+_NULL_PCT_MESSAGES = (
+    "⚠️ **Minor Nulls**: {:.2f}% null values detected. Consider if nulls are expected or indicate data quality issues.",
+    "⚠️ **Moderate Nulls**: {:.2f}% null values present. Investigate root cause and consider imputation strategies.",
+    "🔴 **High Nulls**: {:.2f}% null values is significant. This column may have data collection issues.",
+)
+_PERFECT_COMPLETENESS = "✅ **Perfect Completeness**: Column has no null values, indicating reliable data capture."
+_POTENTIAL_PRIMARY_KEY = "🔑 **Potential Primary Key**: Nearly 100% unique values. Consider using as a primary key."
+_LOW_CARDINALITY = "📊 **Low Cardinality**: Only {} distinct values. Good candidate for categorical analysis or indexing."
+_NEGATIVE_VALUES = "🔍 **Negative Values**: Found {:,} negative values. Verify if negative values are valid for this field."
+_MANY_ZEROS = "⚠️ **Many Zeros**: {:,} zero values ({:.1f}%). Check if zeros represent missing data."
+_OUTLIERS = "📊 **Outliers Detected**: Maximum value is >3σ from mean. Review extreme values for data entry errors."
+_EXCELLENT_QUALITY = "✅ **Excellent Quality**: Quality score of {}/100 indicates well-maintained data."
+_QUALITY_CONCERNS = "⚠️ **Quality Concerns**: Quality score of {}/100. Focus on improving completeness and consistency."
+_NO_ISSUES = "💡 **Data Looks Reasonable**: No major quality issues detected in this column."
+
+
 def generate_rule_based_insights(column_data: dict) -> str:
     """Generate rule-based insights as fallback."""
+    get = column_data.get
+    null_pct = get('nullPct', 0)
+    unique_pct = get('uniquePct', 0)
+    unique_values = get('uniqueValues', 0)
+    total_rows = get('totalRows', 1)
+    quality = get('quality', 0)
     insights = []
     
     # Null check
-    null_pct = column_data.get('nullPct', 0)
     if null_pct == 0:
-        insights.append("✅ **Perfect Completeness**: Column has no null values, indicating reliable data capture.")
-    elif null_pct < 5:
-        insights.append(f"⚠️ **Minor Nulls**: {null_pct:.2f}% null values detected. Consider if nulls are expected or indicate data quality issues.")
-    elif null_pct < 20:
-        insights.append(f"⚠️ **Moderate Nulls**: {null_pct:.2f}% null values present. Investigate root cause and consider imputation strategies.")
+        insights.append(_PERFECT_COMPLETENESS)
     else:
-        insights.append(f"🔴 **High Nulls**: {null_pct:.2f}% null values is significant. This column may have data collection issues.")
+        insights.append(_NULL_PCT_MESSAGES[bisect_right(_NULL_PCT_THRESHOLDS, null_pct)].format(null_pct))
     
     # Uniqueness check
-    unique_pct = column_data.get('uniquePct', 0)
     if unique_pct > 99:
-        insights.append("🔑 **Potential Primary Key**: Nearly 100% unique values. Consider using as a primary key.")
-    elif unique_pct < 1 and column_data.get('uniqueValues', 0) < 10:
-        insights.append(f"📊 **Low Cardinality**: Only {column_data.get('uniqueValues', 0)} distinct values. Good candidate for categorical analysis or indexing.")
+        insights.append(_POTENTIAL_PRIMARY_KEY)
+    elif unique_pct < 1 and unique_values < 10:
+        insights.append(_LOW_CARDINALITY.format(unique_values))
     
     # Numeric insights
-    if column_data.get('mean') is not None:
-        zeros = column_data.get('zerosCount', 0)
-        negatives = column_data.get('negativesCount', 0)
+    if get('mean') is not None:
+        zeros = get('zerosCount', 0)
+        negatives = get('negativesCount', 0)
         
         if negatives > 0:
-            insights.append(f"🔍 **Negative Values**: Found {negatives:,} negative values. Verify if negative values are valid for this field.")
+            insights.append(_NEGATIVE_VALUES.format(negatives))
         
-        if zeros > column_data.get('totalRows', 1) * 0.1:
-            insights.append(f"⚠️ **Many Zeros**: {zeros:,} zero values ({zeros/column_data.get('totalRows', 1)*100:.1f}%). Check if zeros represent missing data.")
+        if zeros > total_rows * 0.1:
+            insights.append(_MANY_ZEROS.format(zeros, zeros / total_rows * 100))
         
         # Check for outliers
-        stddev_val = to_float(column_data.get('stddev', 0))
+        stddev_val = to_float(get('stddev', 0))
         if stddev_val and stddev_val > 0:
-            mean_val = to_float(column_data.get('mean', 0))
-            max_val = to_float(column_data.get('maxValue', 0))
+            mean_val = to_float(get('mean', 0))
+            max_val = to_float(get('maxValue', 0))
             
-            if mean_val is not None and max_val is not None and stddev_val is not None:
-                if max_val > mean_val + (3 * stddev_val):
-                    insights.append("📊 **Outliers Detected**: Maximum value is >3σ from mean. Review extreme values for data entry errors.")
+            if mean_val is not None and max_val is not None and max_val > mean_val + (3 * stddev_val):
+                insights.append(_OUTLIERS)
     
     # Quality score
-    quality = column_data.get('quality', 0)
     if quality >= 95:
-        insights.append(f"✅ **Excellent Quality**: Quality score of {quality}/100 indicates well-maintained data.")
+        insights.append(_EXCELLENT_QUALITY.format(quality))
     elif quality < 70:
-        insights.append(f"⚠️ **Quality Concerns**: Quality score of {quality}/100. Focus on improving completeness and consistency.")
+        insights.append(_QUALITY_CONCERNS.format(quality))
     
     # If no insights generated, add a generic one
     if not insights:
-        insights.append("💡 **Data Looks Reasonable**: No major quality issues detected in this column.")
+        insights.append(_NO_ISSUES)
     
     return "\n\n".join(insights)
 
@@ -1387,80 +2188,397 @@ def generate_rule_based_insights(column_data: dict) -> str:
 
 # Shared storage for snapshots using filesystem (works across gunicorn workers)
 # In production, use a database or Redis for better persistence
-profile_snapshots = {}
+# Disk is the source of truth; workers keep no snapshot state in memory
 SNAPSHOTS_DIR = "/tmp/databricks_profiler_snapshots"
 
 def ensure_snapshots_dir():
     """Ensure the snapshots directory exists"""
     os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
 
-def load_snapshots_from_disk():
-    """Load all snapshots from disk into memory"""
+# Snapshots are stored as gzip-compressed JSON; plain .json files from older versions are still read
+_SNAPSHOT_SUFFIX = ".json.gz"
+_LEGACY_SNAPSHOT_SUFFIX = ".json"
+_SNAPSHOT_GZIP_LEVEL = 6
+# Small per-snapshot companion holding only what compare_snapshots reads
+_COMPARE_VIEW_SUFFIX = ".compare.json"
+# Listing index of every snapshot's summary, so listing never opens the snapshots themselves
+_INDEX_FILENAME = "_index.json"
+_INDEX_LOCK_FILENAME = "_index.lock"
+# (response key, column field) of the metrics compared for every shared column
+_COMPARED_METRICS = (("nulls", "nullPct"), ("uniqueness", "uniquePct"), ("quality", "quality"))
+
+def _snapshot_filenames(snapshot_id: str) -> tuple:
+    """Possible file names of a snapshot, current format first"""
+    return f"{snapshot_id}{_SNAPSHOT_SUFFIX}", f"{snapshot_id}{_LEGACY_SNAPSHOT_SUFFIX}"
+
+SNAPSHOT_LOAD_WORKERS = int(os.getenv("SNAPSHOT_LOAD_WORKERS", "8"))
+
+def snapshot_summary(snapshot: dict) -> dict:
+    """The listing entry for a snapshot (columnCount is stored at save time; older snapshots count their columns)"""
+    column_count = snapshot.get("columnCount")
+    if column_count is None:
+        column_count = len(snapshot["data"].get("columns", []))
+    return {
+        "id": snapshot["id"],
+        "name": snapshot["name"],
+        "timestamp": snapshot["timestamp"],
+        "columnCount": column_count
+    }
+
+_summary_timestamp = itemgetter("timestamp")
+
+def _read_snapshot_file(filepath: str):
+    """Parse one snapshot file, returning the exception instead of raising so one bad file can't stop a scan"""
+    try:
+        with open(filepath, 'rb') as f:
+            payload = f.read()
+        if filepath.endswith(".gz"):
+            payload = gzip.decompress(payload)
+        return orjson.loads(payload)
+    except Exception as e:
+        return e
+
+def snapshot_files() -> Dict[str, str]:
+    """Snapshot id -> path of every snapshot file on disk (current format preferred over legacy)"""
     ensure_snapshots_dir()
-    loaded_count = 0
-    for filename in os.listdir(SNAPSHOTS_DIR):
-        if filename.endswith('.json'):
-            filepath = os.path.join(SNAPSHOTS_DIR, filename)
+    files = {}
+    with os.scandir(SNAPSHOTS_DIR) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith("_") or name.endswith(_COMPARE_VIEW_SUFFIX):
+                continue
+            if name.endswith(_SNAPSHOT_SUFFIX):
+                files[name[:-len(_SNAPSHOT_SUFFIX)]] = entry.path
+            elif name.endswith(_LEGACY_SNAPSHOT_SUFFIX):
+                files.setdefault(name[:-len(_LEGACY_SNAPSHOT_SUFFIX)], entry.path)
+    return files
+
+def read_snapshot_summaries(paths: List[str]) -> List[dict]:
+    """Parse snapshot files into listing summaries, skipping (and logging) unreadable ones"""
+    # Reads of independent files overlap on a few threads
+    if len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(SNAPSHOT_LOAD_WORKERS, len(paths))) as pool:
+            parsed = list(pool.map(_read_snapshot_file, paths))
+    else:
+        parsed = [_read_snapshot_file(path) for path in paths]
+    
+    summaries = []
+    for path, snapshot in zip(paths, parsed):
+        try:
+            if isinstance(snapshot, Exception):
+                raise snapshot
+            summaries.append(snapshot_summary(snapshot))
+        except Exception as e:
+            logger.warning("Error loading snapshot %s: %s", os.path.basename(path), e)
+    return summaries
+
+def _write_file_atomic(filepath: str, payload: bytes):
+    """Write in one call to a temp file, fsync, then rename into place so readers never see a partial file"""
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+# Most write requests one flush of the snapshot writer takes on
+_WRITE_BATCH_MAX = 32
+
+
+class BatchedFileWriter:
+    """
+    Background thread that makes queued atomic writes durable together (group commit)
+    Every request queued while a flush is running joins the next one: all temp files are written,
+    fsynced in one tight pass, then renamed into place, so concurrent saves share the device latency
+    """
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def write(self, files: List[tuple]):
+        """Atomically write [(filepath, payload), ...], returning once every file is durable and in place"""
+        future = Future()
+        with self._lock:
+            # Started on first use, so each forked worker runs its own thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((files, future))
+        future.result()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < _WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+    
+    @staticmethod
+    def _flush(batch: List[tuple]):
+        written = []  # ([(tmp_path, filepath), ...], future) of requests whose temp files are on disk
+        for files, future in batch:
+            try:
+                renames = []
+                for filepath, payload in files:
+                    tmp_path = filepath + ".tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(payload)
+                    renames.append((tmp_path, filepath))
+                written.append((renames, future))
+            except Exception as e:
+                future.set_exception(e)
+        
+        # One fsync pass with no other work interleaved, then every rename
+        synced = []
+        for renames, future in written:
             try:
-                with open(filepath, 'r') as f:
-                    snapshot = json.load(f)
-                    profile_snapshots[snapshot['id']] = snapshot
-                    loaded_count += 1
+                for tmp_path, _ in renames:
+                    fd = os.open(tmp_path, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                synced.append((renames, future))
+            except Exception as e:
+                future.set_exception(e)
+        for renames, future in synced:
+            try:
+                for tmp_path, filepath in renames:
+                    os.replace(tmp_path, filepath)
+                future.set_result(None)
             except Exception as e:
-                print(f"⚠️ Error loading snapshot {filename}: {e}")
-    return loaded_count
+                future.set_exception(e)
+
+
+_SNAPSHOT_WRITER = BatchedFileWriter()
+
+def build_compare_view(snapshot: dict) -> dict:
+    """The slice of a snapshot that comparisons read: one [name, *_COMPARED_METRICS, mean] row per column"""
+    return {
+        "name": snapshot['name'],
+        "timestamp": snapshot['timestamp'],
+        "columns": [
+            [col['name'], *(col.get(key, 0) for _, key in _COMPARED_METRICS), col.get('mean')]
+            for col in snapshot['data'].get('columns', [])
+        ]
+    }
 
 def save_snapshot_to_disk(snapshot_id: str, snapshot_data: dict):
-    """Save a snapshot to disk for persistence across workers"""
+    """Save a snapshot, and its compare view alongside it, to disk for persistence across workers"""
     ensure_snapshots_dir()
-    filepath = os.path.join(SNAPSHOTS_DIR, f"{snapshot_id}.json")
-    with open(filepath, 'w') as f:
-        json.dump(snapshot_data, f)
-    print(f"💾 Persisted snapshot to disk: {filepath}")
-
-def delete_snapshot_from_disk(snapshot_id: str):
-    """Delete a snapshot from disk"""
-    filepath = os.path.join(SNAPSHOTS_DIR, f"{snapshot_id}.json")
-    if os.path.exists(filepath):
-        os.remove(filepath)
-        print(f"🗑️ Deleted snapshot from disk: {filepath}")
-
-# Load snapshots at startup (for this worker process)
-startup_loaded = load_snapshots_from_disk()
-print(f"🔄 Worker startup: Loaded {startup_loaded} existing snapshots from {SNAPSHOTS_DIR}")
+    filepath = os.path.join(SNAPSHOTS_DIR, f"{snapshot_id}{_SNAPSHOT_SUFFIX}")
+    _SNAPSHOT_WRITER.write([
+        (filepath, gzip.compress(orjson.dumps(snapshot_data), compresslevel=_SNAPSHOT_GZIP_LEVEL, mtime=0)),
+        (os.path.join(SNAPSHOTS_DIR, f"{snapshot_id}{_COMPARE_VIEW_SUFFIX}"), orjson.dumps(build_compare_view(snapshot_data))),
+    ])
+    update_snapshot_index(add=snapshot_summary(snapshot_data))
+    logger.debug("Persisted snapshot to disk: %s", filepath)
+
+# Snapshot ids are canonical (lowercase, hyphenated) UUID strings; anything else must never reach a file path
+_SNAPSHOT_ID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+def is_snapshot_id(snapshot_id: str) -> bool:
+    """Whether a value is a well-formed snapshot id"""
+    return isinstance(snapshot_id, str) and _SNAPSHOT_ID_RE.fullmatch(snapshot_id) is not None
+
+def _check_snapshot_id(snapshot_id: str):
+    """Reject malformed snapshot ids before any filesystem access"""
+    if not is_snapshot_id(snapshot_id):
+        raise HTTPException(status_code=400, detail="Invalid snapshot id")
+
+def load_snapshot_from_disk(snapshot_id: str) -> Optional[dict]:
+    """Parse one snapshot from disk, or None if it has no file"""
+    for filename in _snapshot_filenames(snapshot_id):
+        snapshot = _read_snapshot_file(os.path.join(SNAPSHOTS_DIR, filename))
+        if isinstance(snapshot, FileNotFoundError):
+            continue
+        if isinstance(snapshot, Exception):
+            raise snapshot
+        return snapshot
+    return None
+
+def open_snapshot_file(snapshot_id: str):
+    """Open a snapshot's file for reading its (decompressed) JSON bytes, or None if it has no file"""
+    for filename in _snapshot_filenames(snapshot_id):
+        filepath = os.path.join(SNAPSHOTS_DIR, filename)
+        try:
+            return gzip.open(filepath, 'rb') if filepath.endswith(".gz") else open(filepath, 'rb')
+        except FileNotFoundError:
+            continue
+    return None
+
+def iter_snapshot_response(snapshot_file, chunk_size: int = 64 * 1024):
+    """Wrap a snapshot file's JSON in the {"snapshot": ...} envelope chunk by chunk, closing the file at the end"""
+    with snapshot_file:
+        yield b'{"snapshot":'
+        while chunk := snapshot_file.read(chunk_size):
+            yield chunk
+        yield b'}'
+
+def iter_json_array(key: str, records: list):
+    """Encode {key: [records...]} one record at a time instead of building the whole body"""
+    yield b'{"' + key.encode() + b'":['
+    for i, record in enumerate(records):
+        if i:
+            yield b','
+        yield orjson.dumps(record)
+    yield b']}'
+
+def read_snapshot_index() -> Optional[List[dict]]:
+    """The shared listing index (summaries, oldest first), or None if it is missing or corrupt"""
+    try:
+        with open(os.path.join(SNAPSHOTS_DIR, _INDEX_FILENAME), 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except orjson.JSONDecodeError:
+        logger.warning("Snapshot index %s is corrupt, rebuilding it", _INDEX_FILENAME)
+        return None
+
+def update_snapshot_index(remove_id: Optional[str] = None, add: Optional[dict] = None,
+                          reconcile: bool = False) -> List[dict]:
+    """
+    Remove and/or insert one summary in the listing index under an exclusive lock shared by all workers
+    A missing or corrupt index is rebuilt from a scan of the snapshot files first; reconcile=True also
+    brings an existing index in line with the files (listing unindexed snapshots, dropping deleted ones)
+    """
+    ensure_snapshots_dir()
+    with open(os.path.join(SNAPSHOTS_DIR, _INDEX_LOCK_FILENAME), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when the lock file is closed
+        summaries = read_snapshot_index()
+        if summaries is None:
+            summaries = sorted(read_snapshot_summaries(list(snapshot_files().values())), key=_summary_timestamp)
+        elif reconcile:
+            files = snapshot_files()
+            summaries = [summary for summary in summaries if summary["id"] in files]
+            indexed = {summary["id"] for summary in summaries}
+            unindexed = [path for snapshot_id, path in files.items() if snapshot_id not in indexed]
+            for summary in read_snapshot_summaries(unindexed):
+                insort(summaries, summary, key=_summary_timestamp)
+        elif remove_id is None and add is None:
+            return summaries
+        
+        for snapshot_id in (remove_id, add and add["id"]):
+            if snapshot_id is not None:
+                summaries = [summary for summary in summaries if summary["id"] != snapshot_id]
+        if add is not None:
+            insort(summaries, add, key=_summary_timestamp)
+        _write_file_atomic(os.path.join(SNAPSHOTS_DIR, _INDEX_FILENAME), orjson.dumps(summaries))
+    return summaries
+
+def load_snapshot_index() -> List[dict]:
+    """The listing index, building it on first use"""
+    summaries = read_snapshot_index()
+    return summaries if summaries is not None else update_snapshot_index()
+
+def list_snapshot_summaries() -> List[dict]:
+    """
+    The listing index, reconciled with the snapshot files on disk when they disagree
+    (e.g. a worker died between writing a snapshot and indexing it, or a file was removed by hand)
+    """
+    summaries = read_snapshot_index()
+    if summaries is None or {summary["id"] for summary in summaries} != snapshot_files().keys():
+        summaries = update_snapshot_index(reconcile=True)
+    return summaries
+
+def load_compare_view(snapshot_id: str) -> Optional[dict]:
+    """
+    Read a snapshot's compare view, or None if the snapshot doesn't exist
+    Snapshots saved before compare views existed are parsed in full once and get their view written then
+    """
+    if not is_snapshot_id(snapshot_id):
+        return None
+    view_path = os.path.join(SNAPSHOTS_DIR, f"{snapshot_id}{_COMPARE_VIEW_SUFFIX}")
+    try:
+        with open(view_path, 'rb') as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        pass
+    
+    snapshot = load_snapshot_from_disk(snapshot_id)
+    if snapshot is None:
+        return None
+    view = build_compare_view(snapshot)
+    try:
+        _write_file_atomic(view_path, orjson.dumps(view))
+    except OSError as e:
+        logger.warning("Could not write compare view for %s: %s", snapshot_id, e)
+    return view
+
+def delete_snapshot_from_disk(snapshot_id: str) -> bool:
+    """
+    Delete a snapshot's files (compare view first, so a view never outlives its snapshot), then its index entry
+    Returns whether a snapshot file existed
+    """
+    try:
+        os.remove(os.path.join(SNAPSHOTS_DIR, f"{snapshot_id}{_COMPARE_VIEW_SUFFIX}"))
+    except FileNotFoundError:
+        pass
+    
+    deleted = False
+    for filename in _snapshot_filenames(snapshot_id):
+        filepath = os.path.join(SNAPSHOTS_DIR, filename)
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            continue
+        deleted = True
+        logger.debug("Deleted snapshot from disk: %s", filepath)
+    
+    update_snapshot_index(remove_id=snapshot_id)
+    return deleted
+
+# Make sure the listing index exists at startup (built from the snapshot files the first time);
+# Excel export child processes import this module too and skip it
+if multiprocessing.parent_process() is None:
+    startup_indexed = len(load_snapshot_index())
+    logger.info("Worker startup: %d existing snapshots indexed in %s", startup_indexed, SNAPSHOTS_DIR)
+
+class SaveSnapshotRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    name: str
+    timestamp: str
+    profileData: Dict[str, Any]
+
+
+class CompareSnapshotsRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    snapshotId1: str
+    snapshotId2: str
+
 
 @api_app.post("/snapshots/save")
-async def save_snapshot(request: dict):
+async def save_snapshot(request: SaveSnapshotRequest):
     """
     Save a profile snapshot for later comparison.
     """
     try:
-        snapshot_name = request.get("name")
-        profile_data = request.get("profileData")
-        timestamp = request.get("timestamp")
+        snapshot_name = request.name
+        profile_data = request.profileData
+        timestamp = request.timestamp
         
         # Generate a unique ID using UUID to prevent collisions
         snapshot_id = str(uuid.uuid4())
         
-        # Create a deep copy of the profile data to prevent reference issues
-        import copy
-        profile_data_copy = copy.deepcopy(profile_data)
-        
         snapshot_data = {
             "id": snapshot_id,
             "name": snapshot_name,
             "timestamp": timestamp,
-            "data": profile_data_copy
+            "columnCount": len(profile_data.get("columns", [])),
+            "data": profile_data  # parsed fresh from this request body, nothing else references it
         }
         
-        # Save to memory AND disk for persistence across workers
-        profile_snapshots[snapshot_id] = snapshot_data
-        save_snapshot_to_disk(snapshot_id, snapshot_data)
+        # Save to disk for persistence across workers
+        await asyncio.to_thread(save_snapshot_to_disk, snapshot_id, snapshot_data)
         
-        print(f"✅ Saved snapshot: ID={snapshot_id}, Name={snapshot_name}")
-        print(f"   Total snapshots in THIS worker's memory: {len(profile_snapshots)}")
-        print(f"   All snapshot IDs in THIS worker: {list(profile_snapshots.keys())}")
-        print(f"   All snapshot names in THIS worker: {[s['name'] for s in profile_snapshots.values()]}")
+        logger.info("Saved snapshot: ID=%s, Name=%s", snapshot_id, snapshot_name)
         
         return {
             "success": True,
@@ -1469,94 +2587,66 @@ async def save_snapshot(request: dict):
         }
     
     except Exception as e:
-        import traceback
-        print(f"Error saving snapshot: {traceback.format_exc()}")
+        logger.exception("Error saving snapshot")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_app.get("/snapshots/list")
 async def list_snapshots():
     """
-    List all saved snapshots (reloads from disk to get snapshots from all workers).
+    List all saved snapshots from the shared listing index (covers snapshots from all workers).
     """
     try:
-        print(f"📋 Listing snapshots request received")
+        # The index is kept in timestamp order; newest first
+        snapshots = (await asyncio.to_thread(list_snapshot_summaries))[::-1]
         
-        # Reload from disk to get snapshots saved by other workers
-        load_snapshots_from_disk()
-        
-        print(f"   Total in memory after reload: {len(profile_snapshots)}")
-        print(f"   Snapshot IDs: {list(profile_snapshots.keys())}")
-        
-        snapshots = [
-            {
-                "id": snap["id"],
-                "name": snap["name"],
-                "timestamp": snap["timestamp"],
-                "columnCount": len(snap["data"].get("columns", []))
-            }
-            for snap in profile_snapshots.values()
-        ]
+        logger.debug("Returning %d snapshots", len(snapshots))
         
-        # Sort by timestamp descending
-        snapshots.sort(key=lambda x: x["timestamp"], reverse=True)
-        
-        print(f"   Returning {len(snapshots)} snapshots to frontend")
-        for snap in snapshots:
-            print(f"   - {snap['name']} (ID: {snap['id'][:8]}..., {snap['columnCount']} cols)")
-        
-        return {"snapshots": snapshots}
+        return StreamingResponse(iter_json_array("snapshots", snapshots), media_type="application/json")
     
     except Exception as e:
-        import traceback
-        print(f"Error listing snapshots: {traceback.format_exc()}")
+        logger.exception("Error listing snapshots")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_app.get("/snapshots/{snapshot_id}")
 async def get_snapshot(snapshot_id: str):
     """
-    Retrieve a specific snapshot (reloads from disk if not in memory).
+    Retrieve a specific snapshot, streamed straight from its file without parsing it.
     """
     try:
-        # Try memory first, then reload from disk
-        if snapshot_id not in profile_snapshots:
-            load_snapshots_from_disk()
+        _check_snapshot_id(snapshot_id)
         
-        if snapshot_id not in profile_snapshots:
+        snapshot_file = await asyncio.to_thread(open_snapshot_file, snapshot_id)
+        if snapshot_file is None:
             raise HTTPException(status_code=404, detail="Snapshot not found")
         
-        return {"snapshot": profile_snapshots[snapshot_id]}
+        return StreamingResponse(iter_snapshot_response(snapshot_file), media_type="application/json")
     
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error retrieving snapshot: {traceback.format_exc()}")
+        logger.exception("Error retrieving snapshot")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_app.delete("/snapshots/{snapshot_id}")
 async def delete_snapshot(snapshot_id: str):
     """
-    Delete a specific snapshot from memory and disk.
+    Delete a specific snapshot from memory and disk (touches only that snapshot's files).
     """
     try:
-        # Reload from disk first
-        load_snapshots_from_disk()
-        
-        if snapshot_id not in profile_snapshots:
-            raise HTTPException(status_code=404, detail="Snapshot not found")
+        _check_snapshot_id(snapshot_id)
         
-        # Get name for logging before deleting
-        snapshot_name = profile_snapshots[snapshot_id].get("name", "Unknown")
+        # Name for logging, from the shared index (covers snapshots saved by any worker)
+        summaries = await asyncio.to_thread(load_snapshot_index)
+        snapshot_name = next((summary["name"] for summary in summaries if summary["id"] == snapshot_id), "Unknown")
         
         # Delete from both memory and disk
-        del profile_snapshots[snapshot_id]
-        delete_snapshot_from_disk(snapshot_id)
+        if not await asyncio.to_thread(delete_snapshot_from_disk, snapshot_id):
+            raise HTTPException(status_code=404, detail="Snapshot not found")
         
-        print(f"✅ Deleted snapshot: ID={snapshot_id}, Name={snapshot_name}")
-        print(f"   Remaining snapshots in THIS worker: {len(profile_snapshots)}")
+        logger.info("Deleted snapshot: ID=%s, Name=%s", snapshot_id, snapshot_name)
         
         return {
             "success": True,
@@ -1566,91 +2656,57 @@ async def delete_snapshot(snapshot_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error deleting snapshot: {traceback.format_exc()}")
+        logger.exception("Error deleting snapshot")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @api_app.post("/snapshots/compare")
-async def compare_snapshots(request: dict):
+async def compare_snapshots(request: CompareSnapshotsRequest):
     """
-    Compare two profile snapshots (reloads from disk to ensure both are available).
+    Compare two profile snapshots using just their compare views.
     """
     try:
-        snapshot_id_1 = request.get("snapshotId1")
-        snapshot_id_2 = request.get("snapshotId2")
-        
-        print(f"🔍 Comparing snapshots: ID1={snapshot_id_1}, ID2={snapshot_id_2}")
+        snapshot_id_1 = request.snapshotId1
+        snapshot_id_2 = request.snapshotId2
         
-        # Reload from disk to get snapshots from all workers
-        load_snapshots_from_disk()
+        logger.debug("Comparing snapshots: ID1=%s, ID2=%s", snapshot_id_1, snapshot_id_2)
+        _check_snapshot_id(snapshot_id_1)
+        _check_snapshot_id(snapshot_id_2)
         
-        print(f"   Available snapshots after reload: {list(profile_snapshots.keys())}")
-        
-        if snapshot_id_1 not in profile_snapshots or snapshot_id_2 not in profile_snapshots:
-            print(f"   ❌ ERROR: Snapshot not found. ID1 exists: {snapshot_id_1 in profile_snapshots}, ID2 exists: {snapshot_id_2 in profile_snapshots}")
-            raise HTTPException(status_code=404, detail=f"One or both snapshots not found. Available: {list(profile_snapshots.keys())}")
+        # Only the two compare views are read, whichever worker saved the snapshots
+        snap1, snap2 = await asyncio.gather(
+            asyncio.to_thread(load_compare_view, snapshot_id_1),
+            asyncio.to_thread(load_compare_view, snapshot_id_2),
+        )
         
-        snap1 = profile_snapshots[snapshot_id_1]
-        snap2 = profile_snapshots[snapshot_id_2]
+        if snap1 is None or snap2 is None:
+            logger.debug("Snapshot not found for compare: ID1 exists=%s, ID2 exists=%s", snap1 is not None, snap2 is not None)
+            raise HTTPException(status_code=404, detail="One or both snapshots not found")
         
-        # Compare columns
+        # One pass over each column list: snap2 emits changed/added, whatever snap1 has left is removed
+        by_name = {row[0]: row for row in snap1['columns']}
         comparisons = []
-        
-        snap1_cols = {col['name']: col for col in snap1['data'].get('columns', [])}
-        snap2_cols = {col['name']: col for col in snap2['data'].get('columns', [])}
-        
-        all_col_names = set(snap1_cols.keys()) | set(snap2_cols.keys())
-        
-        for col_name in all_col_names:
-            col1 = snap1_cols.get(col_name)
-            col2 = snap2_cols.get(col_name)
+        for row2 in snap2['columns']:
+            col_name = row2[0]
+            row1 = by_name.pop(col_name, None)
+            if row1 is None:
+                comparisons.append({"columnName": col_name, "status": "added"})
+                continue
             
-            if col1 and col2:
-                # Both exist - compare metrics
-                comparison = {
-                    "columnName": col_name,
-                    "status": "changed",
-                    "changes": {
-                        "nulls": {
-                            "before": col1.get('nullPct', 0),
-                            "after": col2.get('nullPct', 0),
-                            "delta": col2.get('nullPct', 0) - col1.get('nullPct', 0)
-                        },
-                        "uniqueness": {
-                            "before": col1.get('uniquePct', 0),
-                            "after": col2.get('uniquePct', 0),
-                            "delta": col2.get('uniquePct', 0) - col1.get('uniquePct', 0)
-                        },
-                        "quality": {
-                            "before": col1.get('quality', 0),
-                            "after": col2.get('quality', 0),
-                            "delta": col2.get('quality', 0) - col1.get('quality', 0)
-                        }
-                    }
-                }
-                
-                # Add numeric changes if available
-                if col1.get('mean') is not None and col2.get('mean') is not None:
-                    comparison['changes']['mean'] = {
-                        "before": col1.get('mean', 0),
-                        "after": col2.get('mean', 0),
-                        "delta": col2.get('mean', 0) - col1.get('mean', 0)
-                    }
-                
-                comparisons.append(comparison)
+            changes = {
+                label: {"before": row1[idx], "after": row2[idx], "delta": row2[idx] - row1[idx]}
+                for idx, (label, _) in enumerate(_COMPARED_METRICS, start=1)
+            }
             
-            elif col1 and not col2:
-                comparisons.append({
-                    "columnName": col_name,
-                    "status": "removed"
-                })
+            # Add numeric changes if available
+            mean1 = row1[-1]
+            mean2 = row2[-1]
+            if mean1 is not None and mean2 is not None:
+                changes['mean'] = {"before": mean1, "after": mean2, "delta": mean2 - mean1}
             
-            elif col2 and not col1:
-                comparisons.append({
-                    "columnName": col_name,
-                    "status": "added"
-                })
+            comparisons.append({"columnName": col_name, "status": "changed", "changes": changes})
+        
+        comparisons.extend({"columnName": col_name, "status": "removed"} for col_name in by_name)
         
         return {
             "comparison": {
@@ -1663,16 +2719,64 @@ async def compare_snapshots(request: dict):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"Error comparing snapshots: {traceback.format_exc()}")
+        logger.exception("Error comparing snapshots")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# Static Files
+# ============================================================================
+
+# Pre-compressed siblings to look for, in order of preference
+_PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class CompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves pre-built .br/.gz variants and long-lived caching for hashed assets"""
+    
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        accepted = set()
+        for header_name, header_value in scope.get("headers", []):
+            if header_name == b"accept-encoding":
+                accepted.update(
+                    token.split(";")[0].strip()
+                    for token in header_value.decode("latin-1").lower().split(",")
+                )
+        
+        for encoding, suffix in _PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            compressed_path = str(full_path) + suffix
+            try:
+                compressed_stat = os.stat(compressed_path)
+            except OSError:
+                continue
+            response = super().file_response(compressed_path, compressed_stat, scope, status_code)
+            response.headers["content-type"] = mimetypes.guess_type(str(full_path))[0] or "application/octet-stream"
+            response.headers["content-encoding"] = encoding
+            response.headers["vary"] = "Accept-Encoding"
+            return response
+        
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+    
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            # Vite emits content-hashed filenames under assets/, so they never change in place
+            if path.startswith("assets/"):
+                response.headers["cache-control"] = "public, max-age=31536000, immutable"
+            else:
+                response.headers["cache-control"] = "no-cache"
+        return response
+
+
 # Mount React static files at root
 # The 'html=True' parameter ensures index.html is served for all routes (SPA routing)
 ui_app.mount(
     "/",
-    StaticFiles(directory="client/build", html=True),
+    CompressedStaticFiles(directory="client/build", html=True),
     name="ui"
 )
 